@@ -2,4 +2,5 @@ from rid_lib.core import RID
 
 
 class PubPubSpace(RID):
-    space = "pubpub"
\ No newline at end of file
+    space = "pubpub"
+    __slots__ = ()
\ No newline at end of file
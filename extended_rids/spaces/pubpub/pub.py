@@ -1,6 +1,6 @@
 import requests
-from html2text import html2text
 
+from rid_lib import utils
 from rid_lib.core import RID, DataObject
 from rid_lib.exceptions import InvalidReferenceFormatError
 from .base import PubPubSpace
@@ -8,6 +8,7 @@ from .base import PubPubSpace
 
 class PubPubPub(PubPubSpace):
     format = "pub"
+    __slots__ = ("subdomain", "slug", "url")
 
     def __init__(self, subdomain: str, slug: str):
         self.subdomain = subdomain
@@ -28,7 +29,7 @@ class PubPubPub(PubPubSpace):
         
     def dereference(self) -> DataObject:
         resp = requests.get(self.url)
-        pub_text = html2text(resp.text)
+        pub_text = utils.html_to_text(resp.text)
 
         return DataObject(
             json_data={
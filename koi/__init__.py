@@ -1,3 +1,4 @@
 from . import extensions
 
-extensions.patch_rid()
\ No newline at end of file
+extensions.patch_rid()
+extensions.patch_html_conversion()
\ No newline at end of file
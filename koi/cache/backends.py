@@ -0,0 +1,485 @@
+import os, json, time, shutil, sqlite3, threading, mmap
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from koi import utils
+from . import serialization
+
+
+class CacheBackend(ABC):
+    """Storage backend for RID cache entries.
+
+    Backends store cache entries (a dict with "metadata" and "data"
+    fields, see CacheObject) and file attachments, keyed by RID string.
+    The active backend is selected with CACHE_BACKEND in koi.config and
+    bound to CacheInterface.
+    """
+
+    @abstractmethod
+    def read_entry(self, key: str) -> dict | None:
+        """Returns cache entry dict, or None if it doesn't exist."""
+        ...
+
+    @abstractmethod
+    def write_entry(
+        self,
+        key: str,
+        entry: dict,
+        files: dict[str, bytes | str] | None = None
+    ) -> None:
+        """Writes cache entry dict and files, overwriting existing entry."""
+        ...
+
+    @abstractmethod
+    def version(self, key: str):
+        """Returns a value that changes whenever the entry is rewritten.
+
+        Used to validate in-memory copies of entries, returns None if
+        the entry doesn't exist.
+        """
+        ...
+
+    def versions(self, keys: list[str]) -> list:
+        """Returns entry versions (or None) in the order of keys."""
+        return [self.version(key) for key in keys]
+
+    def read_entries(self, keys: list[str]) -> list[dict | None]:
+        """Returns cache entry dicts (or None) in the order of keys."""
+        return [self.read_entry(key) for key in keys]
+
+    def read_metadata(self, keys: list[str]) -> list[dict | None]:
+        """Returns entry metadata (or None) in the order of keys.
+
+        Backends which store metadata separately read only metadata,
+        without decoding entries' data.
+        """
+        return [
+            entry["metadata"] if entry else None
+            for entry in self.read_entries(keys)
+        ]
+
+    def write_entries(
+        self,
+        entries: list[tuple[str, dict, dict[str, bytes | str] | None]]
+    ) -> None:
+        """Writes a batch of (key, entry, files) tuples."""
+        for key, entry, files in entries:
+            self.write_entry(key, entry, files)
+
+    @abstractmethod
+    def read_file(self, key: str, file_name: str) -> bytes | None:
+        """Returns file contents, or None if it doesn't exist."""
+        ...
+
+    @abstractmethod
+    def file_size(self, key: str, file_name: str) -> int | None:
+        """Returns file size in bytes, or None if it doesn't exist."""
+        ...
+
+    @abstractmethod
+    def open_file(self, key: str, file_name: str):
+        """Context manager yielding a read-only buffer of a file.
+
+        The buffer supports len() and slicing without reading the whole
+        file into memory, from any thread (one at a time). Raises
+        FileNotFoundError if it doesn't exist.
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Deletes cache entry and associated files."""
+        ...
+
+    @abstractmethod
+    def drop(self) -> None:
+        """Deletes all cache entries."""
+        ...
+
+    def migrate(self) -> int:
+        """Migrates entries from legacy layouts, returns number migrated."""
+        return 0
+
+    @staticmethod
+    def check_file_name(file_name: str) -> str:
+        """Returns file name, or raises ValueError if it isn't a plain name.
+
+        File names come from requests, names with path separators (or
+        '.' and '..') could reach files outside of the entry's files.
+        """
+        if (
+            file_name in ("", ".", "..") or
+            "/" in file_name or "\\" in file_name or "\0" in file_name
+        ):
+            raise ValueError(f"Invalid file name '{file_name}'")
+        return file_name
+
+    @staticmethod
+    def to_bytes(data: bytes | str) -> bytes:
+        if type(data) is str:
+            return data.encode()
+        return data
+
+
+class FileSystemBackend(CacheBackend):
+    """Stores each cache entry as a file in a sharded directory.
+
+    The filename is the SHA-256 hash of the RID string + '.json', and
+    files are sharded into subdirectories named after the first two
+    pairs of hash characters:
+
+        cache/3f/a2/3fa2...e9.json
+        cache/3f/a2/3fa2...e9/  (file attachments)
+
+    Entries are encoded as configured in serialization.py, compact JSON
+    by default (the '.json' extension is kept for all encodings).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def shard_path(self, hashed_key: str):
+        return f"{self.directory}/{hashed_key[:2]}/{hashed_key[2:4]}"
+
+    def file_path(self, key: str):
+        hashed_key = utils.hash_string(key)
+        return f"{self.shard_path(hashed_key)}/{hashed_key}.json"
+
+    def directory_path(self, key: str):
+        hashed_key = utils.hash_string(key)
+        return f"{self.shard_path(hashed_key)}/{hashed_key}"
+
+    def attachment_path(self, key: str, file_name: str):
+        return f"{self.directory_path(key)}/{self.check_file_name(file_name)}"
+
+    def read_entry(self, key):
+        try:
+            with open(self.file_path(key), "rb") as f:
+                return serialization.decode(f.read())
+        except FileNotFoundError:
+            return None
+
+    def version(self, key):
+        try:
+            return os.stat(self.file_path(key)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def write_entry(self, key, entry, files=None):
+        self.write_entries([(key, entry, files)])
+
+    def write_entries(self, entries):
+        created_shards = set()
+        for key, entry, files in entries:
+            hashed_key = utils.hash_string(key)
+            shard_path = self.shard_path(hashed_key)
+            if shard_path not in created_shards:
+                os.makedirs(shard_path, exist_ok=True)
+                created_shards.add(shard_path)
+
+            self._write_files(shard_path, hashed_key, files)
+
+            with open(f"{shard_path}/{hashed_key}.json", "wb") as f:
+                f.write(serialization.encode(entry))
+
+    def _write_files(self, shard_path, hashed_key, files):
+        if files:
+            directory_path = f"{shard_path}/{hashed_key}"
+            os.makedirs(directory_path, exist_ok=True)
+
+            for file_name, binary_data in files.items():
+                file_name = self.check_file_name(file_name)
+                with open(f"{directory_path}/{file_name}", "wb") as f:
+                    f.write(self.to_bytes(binary_data))
+
+    def read_file(self, key, file_name):
+        try:
+            with open(self.attachment_path(key, file_name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def file_size(self, key, file_name):
+        try:
+            return os.stat(self.attachment_path(key, file_name)).st_size
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def open_file(self, key, file_name):
+        with open(self.attachment_path(key, file_name), "rb") as f:
+            # empty files can't be memory mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield buffer
+
+    def delete(self, key):
+        try:
+            os.remove(self.file_path(key))
+        except FileNotFoundError:
+            pass
+
+        shutil.rmtree(self.directory_path(key), ignore_errors=True)
+
+    def drop(self):
+        try:
+            shutil.rmtree(self.directory)
+        except FileNotFoundError:
+            return
+
+    def migrate(self):
+        """Moves cache entries from the flat base64 layout to shards.
+
+        Legacy entries were stored as 'cache/<base64 RID>.json', with
+        files in 'cache/<base64 RID>/'. Entries and file directories are
+        moved in place, so the migration can be safely rerun if it is
+        interrupted.
+        """
+        if not os.path.exists(self.directory):
+            return 0
+
+        migrated = 0
+        for entry in os.scandir(self.directory):
+            encoded_rid, ext = os.path.splitext(entry.name)
+
+            # shard directories are named with two hex characters
+            if entry.is_dir() and len(entry.name) == 2:
+                continue
+            if entry.is_file() and ext != ".json":
+                continue
+
+            try:
+                rid_str = utils.decode_b64(encoded_rid)
+            except ValueError:
+                print(f"skipping unrecognized cache entry '{entry.name}'")
+                continue
+
+            hashed_key = utils.hash_string(rid_str)
+            shard_path = self.shard_path(hashed_key)
+            os.makedirs(shard_path, exist_ok=True)
+
+            if entry.is_file():
+                os.replace(entry.path, f"{shard_path}/{hashed_key}.json")
+                migrated += 1
+            elif not os.path.exists(f"{shard_path}/{hashed_key}"):
+                os.replace(entry.path, f"{shard_path}/{hashed_key}")
+
+        return migrated
+
+
+class SQLiteBackend(CacheBackend):
+    """Stores all cache entries in a single embedded SQLite database.
+
+    Entry metadata (as JSON text) and JSON data (encoded as configured 
+    in serialization.py) are stored in the 'entries' table, and file 
+    attachments as blobs in the 'files' table. Each write is a
+    single transaction. Connections are opened per thread, and the
+    database runs in WAL mode so readers don't block writers.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            rid TEXT PRIMARY KEY,
+            metadata TEXT,
+            data TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            rid TEXT NOT NULL,
+            name TEXT NOT NULL,
+            content BLOB NOT NULL,
+            PRIMARY KEY (rid, name)
+        );
+        """
+
+    MAX_PARAMETERS = 900
+
+    @staticmethod
+    def decode_data(data: str | bytes):
+        # legacy rows store data as JSON text
+        if type(data) is str:
+            return json.loads(data)
+        return serialization.decode(data)
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(self.SCHEMA)
+            self.local.connection = connection
+        return connection
+
+    def read_entry(self, key):
+        row = self.connection.execute(
+            "SELECT metadata, data FROM entries WHERE rid = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        metadata, data = row
+        return {
+            "metadata": json.loads(metadata),
+            "data": self.decode_data(data)
+        }
+
+    def version(self, key):
+        row = self.connection.execute(
+            "SELECT updated_at FROM entries WHERE rid = ?", (key,)
+        ).fetchone()
+
+        return row[0] if row else None
+
+    def versions(self, keys):
+        rows = {}
+        for start in range(0, len(keys), self.MAX_PARAMETERS):
+            batch = keys[start:start + self.MAX_PARAMETERS]
+            placeholders = ", ".join("?" * len(batch))
+            rows.update(self.connection.execute(
+                "SELECT rid, updated_at FROM entries "
+                f"WHERE rid IN ({placeholders})",
+                batch
+            ))
+
+        return [rows.get(key) for key in keys]
+
+    def read_entries(self, keys):
+        rows = {}
+        # stays below SQLite's default limit of host parameters per query
+        for start in range(0, len(keys), self.MAX_PARAMETERS):
+            batch = keys[start:start + self.MAX_PARAMETERS]
+            placeholders = ", ".join("?" * len(batch))
+            rows.update(
+                (key, (metadata, data))
+                for key, metadata, data in self.connection.execute(
+                    "SELECT rid, metadata, data FROM entries "
+                    f"WHERE rid IN ({placeholders})",
+                    batch
+                )
+            )
+
+        entries = []
+        for key in keys:
+            if key in rows:
+                metadata, data = rows[key]
+                entries.append({
+                    "metadata": json.loads(metadata),
+                    "data": self.decode_data(data)
+                })
+            else:
+                entries.append(None)
+        return entries
+
+    def read_metadata(self, keys):
+        rows = {}
+        for start in range(0, len(keys), self.MAX_PARAMETERS):
+            batch = keys[start:start + self.MAX_PARAMETERS]
+            placeholders = ", ".join("?" * len(batch))
+            rows.update(self.connection.execute(
+                "SELECT rid, metadata FROM entries "
+                f"WHERE rid IN ({placeholders})",
+                batch
+            ))
+
+        return [
+            json.loads(rows[key]) if key in rows else None
+            for key in keys
+        ]
+
+    def write_entry(self, key, entry, files=None):
+        self.write_entries([(key, entry, files)])
+
+    def write_entries(self, entries):
+        timestamp = time.time()
+        with self.connection as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        key,
+                        serialization.dumps_json(entry["metadata"]).decode(),
+                        serialization.encode(entry["data"]),
+                        timestamp
+                    )
+                    for key, entry, _ in entries
+                ]
+            )
+
+            connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                [
+                    (key, file_name, self.to_bytes(binary_data))
+                    for key, _, files in entries if files
+                    for file_name, binary_data in files.items()
+                ]
+            )
+
+    def read_file(self, key, file_name):
+        row = self.connection.execute(
+            "SELECT content FROM files WHERE rid = ? AND name = ?",
+            (key, file_name)
+        ).fetchone()
+
+        return row[0] if row else None
+
+    def file_size(self, key, file_name):
+        row = self.connection.execute(
+            "SELECT length(content) FROM files WHERE rid = ? AND name = ?",
+            (key, file_name)
+        ).fetchone()
+
+        return row[0] if row else None
+
+    @contextmanager
+    def open_file(self, key, file_name):
+        row = self.connection.execute(
+            "SELECT rowid FROM files WHERE rid = ? AND name = ?",
+            (key, file_name)
+        ).fetchone()
+
+        if row is None:
+            raise FileNotFoundError(f"'{file_name}' not cached for {key}")
+
+        # incremental blob I/O, reads only the requested slices. Streamed
+        # responses can resume on any thread, so the blob gets its own
+        # connection instead of the thread's
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            with connection.blobopen(
+                "files", "content", row[0], readonly=True
+            ) as buffer:
+                yield buffer
+        finally:
+            connection.close()
+
+    def delete(self, key):
+        with self.connection as connection:
+            connection.execute("DELETE FROM entries WHERE rid = ?", (key,))
+            connection.execute("DELETE FROM files WHERE rid = ?", (key,))
+
+    def drop(self):
+        with self.connection as connection:
+            connection.execute("DELETE FROM entries")
+            connection.execute("DELETE FROM files")
+
+
+def create_backend(name: str, directory: str, database: str) -> CacheBackend:
+    """Returns cache backend configured by name."""
+    if name == "filesystem":
+        return FileSystemBackend(directory)
+    elif name == "sqlite":
+        return SQLiteBackend(database)
+    else:
+        raise ValueError(
+            f"Unknown cache backend '{name}', must be one of: "
+            "'filesystem', 'sqlite'")
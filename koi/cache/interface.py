@@ -1,10 +1,16 @@
-import os, json, time, shutil
-
 from rid_lib.core import RID, DataObject
 
-from koi.config import CACHE_DIRECTORY
+from koi.config import (
+    CACHE_BACKEND, 
+    CACHE_DIRECTORY, 
+    CACHE_DATABASE,
+    CACHE_READ_CACHE_SIZE,
+    CACHE_FILE_CHUNK_SIZE
+)
 from koi import utils
+from .backends import CacheBackend, create_backend
 from .object_model import CacheObject
+from .read_cache import ReadCache
 
 
 class CacheInterface:
@@ -25,23 +31,25 @@ class CacheInterface:
         rid.cache.write(data_object)
         print(rid.cache.read().json())
 
-    Each RID can have a cache file, by default located in the 'cache/' 
-    directory, where the filename is the base64 encoding of the RID 
-    string + '.json'. Metadata is automatically generated when 'write'
-    is called.
+    Each RID can have a cache entry, stored by the configured cache
+    backend (see backends.py). By default, entries are JSON files in 
+    the 'cache/' directory, sharded by the SHA-256 hash of the RID 
+    string. Setting CACHE_BACKEND to 'sqlite' stores all entries in a 
+    single embedded database instead. Metadata is automatically 
+    generated when 'write' is called.
+
+    Reads are served from an in-memory LRU (see read_cache.py) when the
+    entry hasn't changed since it was last read, CacheObjects returned
+    by 'read' and 'read_many' are shared and must not be modified.
     """
 
+    backend: CacheBackend = create_backend(
+        CACHE_BACKEND, CACHE_DIRECTORY, CACHE_DATABASE)
+    read_cache = ReadCache(CACHE_READ_CACHE_SIZE)
+
     def __init__(self, rid: RID):
         self.rid = rid
-        self.encoded_rid = utils.encode_b64(str(rid))
-
-    @property
-    def file_path(self):
-        return f"{CACHE_DIRECTORY}/{self.encoded_rid}.json"
-
-    @property
-    def directory_path(self):
-        return f"{CACHE_DIRECTORY}/{self.encoded_rid}"
+        self.key = str(rid)
 
     def write(
             self, 
@@ -51,18 +59,19 @@ class CacheInterface:
         """Writes a DataObject to RID cache.
 
         If inputted DataObject has JSON data, it is written to the cache
-        directory (default 'cache/') as a JSON file with the name set to
-        the base 64 encoding of the RID string.
+        backend as the RID's cache entry, along with generated metadata.
+
+        If inputted DataObject has files, they are written alongside the
+        entry (for the filesystem backend, to a directory named with the
+        hashed RID string).
 
-        If inputted DataObject has files, they are written to a
-        directory named with the encoded RID string (see above).
+        If the JSON data and files hash to the same values as the stored
+        entry, nothing is written and the stored entry is returned with
+        'unchanged' set to True.
 
         Returns a CacheObject.
         """
 
-        if not os.path.exists(CACHE_DIRECTORY):
-            os.makedirs(CACHE_DIRECTORY)
-
         if (data_object is not None and from_dereference is True) or \
             (data_object is None and from_dereference is False):
 
@@ -73,59 +82,186 @@ class CacheInterface:
         if from_dereference:
             data_object = self.rid.dereference()
 
-        if not data_object:
-            return CacheObject()
-
-        if data_object.files:
-            if not os.path.exists(self.directory_path):
-                os.makedirs(self.directory_path)
-            
-            for file_name, binary_data in data_object.files.items():
-                with open(f"{self.directory_path}/{file_name}", "wb") as f:
-                    if type(binary_data) is bytes:
-                        f.write(binary_data)
-                    elif type(binary_data) is str:
-                        f.write(binary_data.encode())
-
-        metadata = utils.generate_metadata(self.rid, data_object)
-        cache_entry = CacheObject(
-            metadata=metadata,
-            json_data=data_object.json_data
-        )
-
-        with open(self.file_path, "w") as f:
-            json.dump(cache_entry.to_dict(), f, indent=2)
-
-        return cache_entry
+        return self.write_many({self.rid: data_object})[0]
 
     def read(self):
         """Reads and returns CacheObject from RID cache."""
-        try:
-            with open(self.file_path, "r") as f:
-                return CacheObject.from_dict(json.load(f))
-        except FileNotFoundError:
-            return CacheObject()
+        return self.read_many([self.rid])[0]
         
+    @classmethod
+    def write_many(
+            cls,
+            data_objects: dict[RID, DataObject]
+        ) -> list[CacheObject]:
+        """Writes a batch of DataObjects to their RIDs' caches.
+
+        Equivalent to calling 'write' for each RID, but the whole batch
+        is handed to the cache backend at once (a single transaction 
+        for the SQLite backend). Empty DataObjects aren't written, and
+        neither are DataObjects identical to the stored entry.
+
+        Returns a list of CacheObjects in input order.
+        """
+        # only metadata is read (and not kept in the read cache), data
+        # is compared by hash
+        stored_metadata = cls.backend.read_metadata(
+            [str(rid) for rid in data_objects])
+
+        cache_entries = []
+        backend_entries = []
+        for (rid, data_object), stored in zip(
+            data_objects.items(), stored_metadata
+        ):
+            if not data_object:
+                cache_entries.append(CacheObject())
+                continue
+
+            metadata = utils.generate_metadata(rid, data_object)
+            if cls.is_unchanged(stored, metadata):
+                # identical hashes, the new data equals the stored data
+                cache_entries.append(CacheObject(
+                    metadata=stored,
+                    json_data=data_object.json_data,
+                    unchanged=True
+                ))
+                continue
+
+            cache_entry = CacheObject(
+                metadata=metadata,
+                json_data=data_object.json_data
+            )
+            cache_entries.append(cache_entry)
+            backend_entries.append(
+                (str(rid), cache_entry.to_dict(), data_object.files))
+
+        cls.backend.write_entries(backend_entries)
+        for key, _, _ in backend_entries:
+            cls.read_cache.invalidate(key)
+
+        return cache_entries
+
+    @staticmethod
+    def is_unchanged(stored_metadata: dict | None, metadata: dict) -> bool:
+        """Returns True if metadata hashes match the stored entry's."""
+        if not stored_metadata:
+            return False
+        
+        return all(
+            stored_metadata.get(key) == metadata.get(key)
+            for key in ("sha256_hash", "files_sha256_hash")
+        )
+
+    @classmethod
+    def read_many(cls, rids: list[RID]) -> list[CacheObject]:
+        """Reads and returns a list of CacheObjects in input order.
+
+        Entries present in the read cache with an up to date version are
+        returned from memory, the rest are read from the backend in one
+        batch.
+        """
+        keys = [str(rid) for rid in rids]
+        versions = cls.backend.versions(keys)
+
+        cache_objects = []
+        missed = {}
+        for i, (key, version) in enumerate(zip(keys, versions)):
+            if version is None:
+                cls.read_cache.invalidate(key)
+                cache_objects.append(CacheObject())
+                continue
+
+            cache_object = cls.read_cache.get(key, version)
+            if cache_object is None:
+                missed[i] = (key, version)
+            cache_objects.append(cache_object)
+
+        missed_entries = cls.backend.read_entries(
+            [key for key, _ in missed.values()])
+
+        for (i, (key, version)), entry in zip(missed.items(), missed_entries):
+            if entry is None:
+                cache_objects[i] = CacheObject()
+                continue
+
+            cache_object = CacheObject.from_dict(entry)
+            cls.read_cache.put(key, version, cache_object)
+            cache_objects[i] = cache_object
+
+        return cache_objects
+
+    @classmethod
+    def read_cache_stats(cls) -> dict:
+        """Returns hit/miss counters and size of the in-memory read cache."""
+        return cls.read_cache.stats()
+
+    def has_file(self, file_name) -> bool:
+        """Returns True if file is listed in the RID's cache entry.
+
+        Only listed files are read, so file names from requests can't
+        reach other files stored by the backend.
+        """
+        return file_name in self.read().files
+
     def read_file(self, file_name):
         """Reads and return file from RID cache."""
-        try:
-            with open(f"{self.directory_path}/{file_name}", "rb") as f:
-                return f.read()
-        except FileNotFoundError:
+        if not self.has_file(file_name):
+            return None
+        return self.backend.read_file(self.key, file_name)
+
+    def file_size(self, file_name) -> int | None:
+        """Returns size of file in RID cache, or None if it isn't cached."""
+        if not self.has_file(file_name):
             return None
+        return self.backend.file_size(self.key, file_name)
+
+    def open_file(self, file_name):
+        """Opens file from RID cache as a read-only buffer.
+
+        Used as a context manager, the buffer is memory mapped (or read 
+        incrementally from the SQLite backend), so slices are read on 
+        demand instead of loading the whole file into memory:
+
+            with rid.cache.open_file("file.pdf") as buffer:
+                header = buffer[:1024]
+
+        Raises FileNotFoundError if the file isn't cached.
+        """
+        if not self.has_file(file_name):
+            raise FileNotFoundError(f"'{file_name}' not cached for {self.key}")
+        return self.backend.open_file(self.key, file_name)
+
+    def iter_file(
+            self, 
+            file_name, 
+            start: int = 0, 
+            end: int | None = None,
+            chunk_size: int = CACHE_FILE_CHUNK_SIZE
+        ):
+        """Yields file from RID cache in chunks, from start to end bytes."""
+        with self.open_file(file_name) as buffer:
+            end = len(buffer) if end is None else min(end, len(buffer))
+            for offset in range(start, end, chunk_size):
+                yield bytes(buffer[offset:min(offset + chunk_size, end)])
 
     def delete(self):
         """Deletes RID cache entry and associated files."""
-        try:
-            os.remove(self.file_path)
-            shutil.rmtree(self.directory_path)
-        except FileNotFoundError:
-            return
+        self.backend.delete(self.key)
+        self.read_cache.invalidate(self.key)
 
-    @staticmethod
-    def drop():
+    @classmethod
+    def drop(cls):
         """Deletes all RID cache entries."""
-        try:
-            shutil.rmtree(CACHE_DIRECTORY)
-        except FileNotFoundError:
-            return
\ No newline at end of file
+        cls.backend.drop()
+        cls.read_cache.clear()
+
+    @classmethod
+    def migrate(cls):
+        """Migrates cache entries from legacy layouts in place.
+
+        For the filesystem backend, moves entries from the flat base64
+        layout ('cache/<base64 RID>.json') to the sharded layout.
+        Returns the number of migrated entries.
+        """
+        migrated = cls.backend.migrate()
+        print(f"migrated {migrated} cache entries")
+        return migrated
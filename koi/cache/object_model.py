@@ -26,6 +26,8 @@ class CacheObject:
 
     metadata: dict | None = None
     json_data: dict | None = None
+    # set when a write was skipped because the data hadn't changed
+    unchanged: bool = field(default=False, compare=False)
     files: list = field(init=False)
 
     def __post_init__(self):
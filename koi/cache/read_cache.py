@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+from .object_model import CacheObject
+
+
+class ReadCache:
+    """Bounded in-memory LRU of parsed cache entries.
+
+    Sits in front of the cache backend to avoid re-reading and parsing
+    the same entry repeatedly (e.g. once per retrieved chunk of a
+    document). Entries are stored with the backend's version of the
+    entry (file mtime or database update time) at the time they were
+    read, and are treated as misses if the version has since changed,
+    which keeps the cache valid when other processes write entries.
+
+    CacheObjects returned from the cache are shared between callers and
+    must not be modified.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, tuple[object, CacheObject]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version) -> CacheObject | None:
+        """Returns cached CacheObject if present and up to date."""
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None and cached[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, version, cache_object: CacheObject):
+        if self.max_size <= 0:
+            return
+
+        with self.lock:
+            self.entries[key] = (version, cache_object)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "max_size": self.max_size
+            }
@@ -0,0 +1,132 @@
+"""Encoding and decoding of cache entries.
+
+By default entries are encoded as compact JSON (using orjson when it is
+installed), which is also how legacy entries were stored, just without
+indentation. Entries can instead be encoded with msgpack, and large
+entries compressed with gzip or zstd, see CACHE_SERIALIZATION and
+CACHE_COMPRESSION in koi.config.
+
+Non-JSON encodings are prefixed with a header identifying the format
+and compression, so entries written with any configuration (including
+legacy pretty-printed JSON) can always be decoded:
+
+    b"\\x00KOI" + format byte + compression byte + payload
+"""
+
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from koi.config import (
+    CACHE_SERIALIZATION,
+    CACHE_COMPRESSION,
+    CACHE_COMPRESSION_THRESHOLD
+)
+
+
+MAGIC = b"\x00KOI"
+
+FORMATS = {"json": b"j", "msgpack": b"m"}
+COMPRESSIONS = {None: b"-", "gzip": b"g", "zstd": b"z"}
+
+
+def require(module, name: str):
+    if module is None:
+        raise ImportError(
+            f"Cache serialization is configured to use '{name}', but it "
+            "is not installed")
+    return module
+
+def dumps_json(obj) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson is stricter than json, e.g. with integers > 64 bits
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def loads_json(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def compress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    elif compression == "zstd":
+        return require(zstandard, "zstd").ZstdCompressor().compress(data)
+    return data
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    elif compression == "zstd":
+        return require(zstandard, "zstd").ZstdDecompressor().decompress(data)
+    return data
+
+def encode(
+    obj,
+    format: str = CACHE_SERIALIZATION,
+    compression: str | None = CACHE_COMPRESSION
+) -> bytes:
+    """Encodes a cache entry (or part of one) to bytes."""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown cache serialization format '{format}'")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown cache compression '{compression}'")
+
+    if format == "msgpack":
+        payload = require(msgpack, "msgpack").packb(obj)
+    else:
+        payload = dumps_json(obj)
+
+    if len(payload) < CACHE_COMPRESSION_THRESHOLD:
+        compression = None
+
+    # plain JSON is stored without a header, readable by other tools
+    if format == "json" and compression is None:
+        return payload
+
+    return (
+        MAGIC + FORMATS[format] + COMPRESSIONS[compression] +
+        compress(payload, compression)
+    )
+
+def decode(data: bytes):
+    """Decodes bytes from any supported encoding, including legacy JSON."""
+    if not data.startswith(MAGIC):
+        return loads_json(data)
+
+    header_length = len(MAGIC)
+    format_byte = data[header_length:header_length + 1]
+    compression_byte = data[header_length + 1:header_length + 2]
+
+    format = next(
+        (k for k, v in FORMATS.items() if v == format_byte), None)
+    compression = next(
+        (k for k, v in COMPRESSIONS.items() if v == compression_byte), False)
+
+    if format is None or compression is False:
+        raise ValueError("Unrecognized cache entry header")
+
+    payload = decompress(data[header_length + 2:], compression)
+
+    if format == "msgpack":
+        return require(msgpack, "msgpack").unpackb(payload)
+    else:
+        return loads_json(payload)
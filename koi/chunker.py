@@ -0,0 +1,319 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator
+
+from koi.config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNK_TOKENS,
+    CHUNK_TOKEN_OVERLAP,
+    MARKDOWN_CHUNK_SIZE,
+    PASSTHROUGH_MAX_SIZE
+)
+
+
+@dataclass
+class Chunk:
+    """A chunk of text, and its exact offsets in the original text."""
+
+    text: str
+    start: int
+    end: int
+
+
+class Chunker:
+    """Splits text into overlapping chunks of at most chunk_size characters.
+
+    Produces the same chunks as langchain's RecursiveCharacterTextSplitter:
+    text is split on the first separator it contains (paragraphs, then
+    lines, then words, then characters), pieces too large for a chunk
+    are split further with the remaining separators, and consecutive
+    small pieces are merged into chunks, with up to chunk_overlap
+    characters of pieces repeated between consecutive chunks.
+
+    Pieces are tracked as offsets into the text rather than substrings,
+    so each chunk's offsets are exact (even if its text also appears
+    earlier in the text), and every character is only visited a fixed
+    number of times. Chunks are yielded as they are found.
+
+    Example:
+        chunker = Chunker(chunk_size=512, chunk_overlap=80)
+        for chunk in chunker.chunks(text):
+            assert text[chunk.start:chunk.end] == chunk.text
+    """
+
+    def __init__(
+            self,
+            chunk_size: int,
+            chunk_overlap: int,
+            separators: tuple[str, ...] = ("\n\n", "\n", " ", "")
+        ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators
+
+    def chunks(self, text: str) -> Iterator[Chunk]:
+        # texts fitting in a chunk are never split
+        if len(text) <= self.chunk_size:
+            yield from self.make_chunk(text, 0, len(text))
+        else:
+            yield from self.split(text, 0, len(text), 0)
+
+    def split(
+            self,
+            text: str,
+            start: int,
+            end: int,
+            level: int
+        ) -> Iterator[Chunk]:
+        """Yields chunks of text[start:end], splitting from separator 'level'.
+
+        Pieces smaller than chunk_size are merged into chunks as they
+        are found, larger pieces are split with the remaining separators.
+        """
+        level = self.find_separator(text, start, end, level)
+        window = deque()
+        length = 0
+
+        for piece_start, piece_end in self.pieces(text, start, end, level):
+            size = piece_end - piece_start
+            if size < self.chunk_size:
+                if window and length + size > self.chunk_size:
+                    yield from self.make_chunk(text, window[0][0], window[-1][1])
+                    while window and (
+                        length > self.chunk_overlap or
+                        length + size > self.chunk_size
+                    ):
+                        first_start, first_end = window.popleft()
+                        length -= first_end - first_start
+
+                window.append((piece_start, piece_end))
+                length += size
+                continue
+
+            if window:
+                yield from self.make_chunk(text, window[0][0], window[-1][1])
+                window.clear()
+                length = 0
+
+            if level + 1 < len(self.separators):
+                yield from self.split(text, piece_start, piece_end, level + 1)
+            else:
+                yield from self.make_chunk(text, piece_start, piece_end)
+
+        if window:
+            yield from self.make_chunk(text, window[0][0], window[-1][1])
+
+    def find_separator(self, text: str, start: int, end: int, level: int) -> int:
+        """Returns level of the first separator found in text[start:end]."""
+        for i in range(level, len(self.separators)):
+            separator = self.separators[i]
+            if separator == "" or text.find(separator, start, end) != -1:
+                return i
+        return len(self.separators) - 1
+
+    def pieces(
+            self,
+            text: str,
+            start: int,
+            end: int,
+            level: int
+        ) -> Iterator[tuple[int, int]]:
+        """Yields (start, end) of the pieces between separators.
+
+        Separators are kept at the start of the piece following them.
+        """
+        separator = self.separators[level]
+        if separator == "":
+            for i in range(start, end):
+                yield i, i + 1
+            return
+
+        piece_start = start
+        position = text.find(separator, start, end)
+        while position != -1:
+            if position > piece_start:
+                yield piece_start, position
+            piece_start = position
+            position = text.find(separator, position + len(separator), end)
+        if end > piece_start:
+            yield piece_start, end
+
+    @staticmethod
+    def make_chunk(text: str, start: int, end: int) -> Iterator[Chunk]:
+        """Yields chunk with surrounding whitespace excluded, if any text."""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            yield Chunk(text[start:end], start, end)
+
+
+class TokenChunker(Chunker):
+    """Chunker with chunk size and overlap budgeted in tokens.
+
+    Tokens are estimated as 4 characters each, like embedding requests
+    (see vectorstore/scheduler.py), so chunks fill a predictable share
+    of the embedding model's context.
+    """
+
+    CHARACTERS_PER_TOKEN = 4
+
+    def __init__(self, chunk_tokens: int, overlap_tokens: int):
+        super().__init__(
+            chunk_tokens * self.CHARACTERS_PER_TOKEN,
+            overlap_tokens * self.CHARACTERS_PER_TOKEN
+        )
+
+
+class PassThroughChunker:
+    """Embeds texts whole, for short content like chat messages.
+
+    Texts longer than 'max_size' characters are split by 'fallback'.
+    """
+
+    def __init__(self, max_size: int, fallback: Chunker):
+        self.max_size = max_size
+        self.fallback = fallback
+
+    def chunks(self, text: str) -> Iterator[Chunk]:
+        if len(text) <= self.max_size:
+            yield from Chunker.make_chunk(text, 0, len(text))
+        else:
+            yield from self.fallback.chunks(text)
+
+
+class MarkdownChunker:
+    """Splits markdown text into chunks along its headings.
+
+    The text is divided into sections starting at each heading (outside
+    of code blocks), and consecutive sections are merged into chunks of
+    up to 'chunk_size' characters, so chunks don't cut across sections.
+    Sections larger than a chunk are split on their own with a Chunker,
+    with the heading kept in the section's first chunk.
+
+    Example:
+        chunker = MarkdownChunker(chunk_size=1024, chunk_overlap=80)
+        for chunk in chunker.chunks(text):
+            assert text[chunk.start:chunk.end] == chunk.text
+    """
+
+    # headings, and code fences which can contain lines starting with '#'
+    BOUNDARY = re.compile(r"^(?:#{1,6}(?:[ \t]|$)|```|~~~)", re.MULTILINE)
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunker = Chunker(chunk_size, chunk_overlap)
+
+    def chunks(self, text: str) -> Iterator[Chunk]:
+        if len(text) <= self.chunk_size:
+            yield from Chunker.make_chunk(text, 0, len(text))
+            return
+
+        window_start = window_end = 0
+        for start, end in self.sections(text):
+            if end - window_start <= self.chunk_size:
+                window_end = end
+                continue
+
+            yield from Chunker.make_chunk(text, window_start, window_end)
+            if end - start <= self.chunk_size:
+                window_start, window_end = start, end
+            else:
+                yield from self.split_section(text, start, end)
+                window_start = window_end = end
+
+        yield from Chunker.make_chunk(text, window_start, window_end)
+
+    def split_section(self, text: str, start: int, end: int) -> Iterator[Chunk]:
+        """Yields chunks of a section larger than a chunk.
+
+        The section's body is split with chunks shortened by the length
+        of the heading, so the heading can be prepended to the first
+        chunk without exceeding chunk_size.
+        """
+        heading_end = text.find("\n", start, end)
+        if not text.startswith("#", start) or heading_end == -1:
+            yield from self.chunker.split(text, start, end, 0)
+            return
+
+        body_start = heading_end
+        while body_start < end and text[body_start].isspace():
+            body_start += 1
+
+        body_size = self.chunk_size - (body_start - start)
+        # headings taking most of a chunk are left in a chunk of their own
+        if body_size < self.chunk_size // 2:
+            yield from self.chunker.split(text, start, end, 0)
+            return
+
+        chunker = Chunker(
+            body_size, min(self.chunker.chunk_overlap, body_size // 2))
+        chunks = chunker.split(text, body_start, end, 0)
+        first = next(chunks, None)
+        if first is None:
+            yield from Chunker.make_chunk(text, start, end)
+            return
+
+        yield Chunk(text[start:first.end], start, first.end)
+        yield from chunks
+
+    def sections(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yields (start, end) of the sections between headings."""
+        section_start = 0
+        fence = None
+        for match in self.BOUNDARY.finditer(text):
+            marker = match.group()
+            if marker in ("```", "~~~"):
+                if fence is None:
+                    fence = marker
+                elif fence == marker:
+                    fence = None
+            elif fence is None and match.start() > section_start:
+                yield section_start, match.start()
+                section_start = match.start()
+        if len(text) > section_start:
+            yield section_start, len(text)
+
+
+def create_chunker(strategy: str):
+    """Returns a chunker for a strategy, configured in config.py.
+
+    Chunkers have a chunks(text) method yielding Chunks with exact
+    offsets into the text.
+    """
+    if strategy == "characters":
+        return Chunker(CHUNK_SIZE, CHUNK_OVERLAP)
+    elif strategy == "tokens":
+        return TokenChunker(CHUNK_TOKENS, CHUNK_TOKEN_OVERLAP)
+    elif strategy == "markdown":
+        return MarkdownChunker(MARKDOWN_CHUNK_SIZE, CHUNK_OVERLAP)
+    elif strategy == "passthrough":
+        return PassThroughChunker(
+            PASSTHROUGH_MAX_SIZE, Chunker(CHUNK_SIZE, CHUNK_OVERLAP))
+    else:
+        raise ValueError(
+            f"Unknown chunking strategy '{strategy}', must be one of: "
+            "'characters', 'tokens', 'markdown', 'passthrough'")
+
+@lru_cache(maxsize=None)
+def get_chunker(strategy: str):
+    """Returns a shared chunker for a strategy."""
+    return create_chunker(strategy)
+
+def chunk_offsets(text: str, strategy: str) -> list[tuple[int, int]]:
+    """Returns (start, end) offsets of the chunks of a text.
+
+    Used to chunk texts in the processing pool, only offsets are sent
+    back to the calling process. This module only depends on koi.config,
+    so workers unpickling it don't import (and connect) the vectorstore.
+    """
+    return [
+        (chunk.start, chunk.end)
+        for chunk in get_chunker(strategy).chunks(text)
+    ]
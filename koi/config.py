@@ -11,10 +11,28 @@ NEO4J_URI = "bolt://localhost:7687"
 NEO4J_AUTH = ("neo4j", "koi-pond")
 NEO4J_DB = "neo4j" 
 
+# "filesystem" or "sqlite"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "filesystem")
 CACHE_DIRECTORY = "cache"
+CACHE_DATABASE = "cache.db"
+# number of parsed entries kept in memory, 0 disables the read cache
+CACHE_READ_CACHE_SIZE = 1024
+CACHE_FILE_CHUNK_SIZE = 64 * 1024
+# "json" or "msgpack", and optionally "gzip" or "zstd" compression for
+# entries larger than the threshold (in bytes)
+CACHE_SERIALIZATION = os.getenv("CACHE_SERIALIZATION", "json")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION") or None
+CACHE_COMPRESSION_THRESHOLD = 4096
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# "pinecone" or "local" (stored in VECTOR_DIRECTORY, requires numpy)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+VECTOR_DIRECTORY = "vectors"
+VECTOR_MANIFEST_PATH = "vector_manifest.db"
+# local backend only, "exact" or "approximate" (HNSW, requires hnswlib)
+VECTOR_SEARCH = os.getenv("VECTOR_SEARCH", "exact")
+
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_CLOUD_PROVIDER = "aws"
 PINECONE_CLOUD_REGION = "us-east-1"
@@ -23,10 +41,45 @@ PINECONE_INDEX_NAME = "koi-pond-dev" if DEV else "koi-pond"
 PINECONE_BATCH_SIZE = 64
 EMBEDDINGS_DIMENSION = 1024
 EMBEDDING_QUEUE_LIMIT = 128
+EMBEDDING_QUEUE_PATH = "embedding_queue.db"
+# seconds a vector can wait in the queue before the worker flushes it
+EMBEDDING_QUEUE_MAX_AGE = 30
+EMBEDDING_CACHE_PATH = "embedding_cache.db"
 
 VOYAGEAI_API_KEY = os.getenv("VOYAGE_API_KEY")
 VOYAGEAI_MODEL = "voyage-2"
 VOYAGEAI_BATCH_SIZE = 128
+# token limits of a request (320K for voyage-2) and of a single text,
+# kept below the provider's since token counts are estimated
+VOYAGEAI_BATCH_TOKEN_LIMIT = 240_000
+VOYAGEAI_MAX_INPUT_TOKENS = 4000
+# embedding requests in flight at once, and the account's rate limits
+VOYAGEAI_CONCURRENCY = 4
+VOYAGEAI_REQUESTS_PER_MINUTE = 300
+VOYAGEAI_TOKENS_PER_MINUTE = 1_000_000
+VOYAGEAI_MAX_RETRIES = 5
 
 CHUNK_SIZE = 512
-CHUNK_OVERLAP = 80
\ No newline at end of file
+CHUNK_OVERLAP = 80
+# chunking strategy by RID type ("space.format") or space, others use
+# "characters" (CHUNK_SIZE and CHUNK_OVERLAP). "tokens" budgets chunks in
+# estimated tokens, "markdown" merges heading sections into chunks, and
+# "passthrough" embeds texts whole up to PASSTHROUGH_MAX_SIZE characters
+CHUNKING_STRATEGIES = {
+    "slack.message": "passthrough",
+    "substack.post": "markdown",
+    "web.page": "tokens"
+}
+CHUNK_TOKENS = 256
+CHUNK_TOKEN_OVERLAP = 32
+MARKDOWN_CHUNK_SIZE = 1024
+PASSTHROUGH_MAX_SIZE = 4096
+
+# worker processes for HTML conversion and chunking (0 runs them in the
+# calling thread), and the maximum number of calls pending at once
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", os.cpu_count() or 1))
+PROCESSING_MAX_IN_FLIGHT = 2 * PROCESSING_WORKERS
+# smaller HTML documents are converted in the calling thread
+PROCESSING_MIN_HTML_SIZE = 20_000
+# concurrent dereferences when creating multiple objects
+DEREFERENCE_THREADS = 8
\ No newline at end of file
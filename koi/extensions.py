@@ -1,28 +1,71 @@
+import rid_lib.utils
 from rid_lib.core import RID
 from rid_lib.types import KoiLink, KoiSet
 
-from .graph import GraphBaseInterface, GraphSetInterface, GraphLinkInterface
-from .cache import CacheInterface
-from .vectorstore import VectorInterface
+from .processing import html_to_text
 
 
+class LazyInterface:
+    """Descriptor binding an interface to RID objects on first access.
+
+    The interface is constructed by calling 'factory' with the RID the
+    first time the attribute is accessed, then cached in the RID's
+    reserved '_interfaces' slot. RIDs which are only parsed or
+    serialized never allocate interfaces.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+
+    def __get__(self, rid: RID, owner=None):
+        if rid is None:
+            return self
+        
+        interfaces = rid._interfaces
+        if interfaces is None:
+            interfaces = {}
+            # RIDs are immutable, the interface cache is set directly
+            object.__setattr__(rid, "_interfaces", interfaces)
+
+        interface = interfaces.get(self.name)
+        if interface is None:
+            interface = interfaces[self.name] = self.factory(rid)
+        return interface
+
 def purge(self: RID):
     self.graph.delete()
     self.cache.delete()
     self.vector.delete()
 
-def extended_rid_post_init(self: RID):
-    """Adds graph, cache, and vector interfaces to RID objects."""
-    if isinstance(self, KoiSet):
-        self.graph = GraphSetInterface(self)
-    elif isinstance(self, KoiLink):
-        self.graph = GraphLinkInterface(self)
+# interfaces are imported on first use, so importing koi doesn't connect
+# to Neo4j or the vector backend (e.g. in processing pool workers)
+def graph_interface(rid: RID):
+    """Returns the graph interface matching the RID type."""
+    from .graph import GraphBaseInterface, GraphSetInterface, GraphLinkInterface
+
+    if isinstance(rid, KoiSet):
+        return GraphSetInterface(rid)
+    elif isinstance(rid, KoiLink):
+        return GraphLinkInterface(rid)
     else:
-        self.graph = GraphBaseInterface(self)
+        return GraphBaseInterface(rid)
+
+def cache_interface(rid: RID):
+    from .cache import CacheInterface
+    return CacheInterface(rid)
 
-    self.cache = CacheInterface(self)
-    self.vector = VectorInterface(self)
+def vector_interface(rid: RID):
+    from .vectorstore import VectorInterface
+    return VectorInterface(rid)
 
 def patch_rid():
-    RID.__post_init__ = extended_rid_post_init
-    RID.purge = purge
\ No newline at end of file
+    """Adds graph, cache, and vector interfaces to RID objects."""
+    RID.graph = LazyInterface("graph", graph_interface)
+    RID.cache = LazyInterface("cache", cache_interface)
+    RID.vector = LazyInterface("vector", vector_interface)
+    RID.purge = purge
+
+def patch_html_conversion():
+    """Converts large HTML documents in the processing pool when dereferencing."""
+    rid_lib.utils.html_to_text = html_to_text
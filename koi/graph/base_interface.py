@@ -28,13 +28,18 @@ class GraphBaseInterface:
         self.rid = rid
     
     def create(self):
-        """Creates a new RID graph object."""
+        """Creates a new RID graph object.
+
+        Objects are labeled with the base label (see schema.py), and the
+        space and format of their RID.
+        """
         @driver.execute_write
         def execute_create(tx: ManagedTransaction):
             labels = f"{self.rid.space}:{self.rid.format}"
 
             CREATE_OBJECT = f"""//cypher
-                MERGE (object:{labels} {{rid: $rid}})
+                MERGE (object:object {{rid: $rid}})
+                SET object:{labels}
                 SET object += $params
                 RETURN object
                 """
@@ -52,7 +57,7 @@ class GraphBaseInterface:
         @driver.execute_read
         def execute_read_link(tx: ManagedTransaction, tag: str):
             READ_OBJECT_LINK = """//cypher
-                MATCH (object {rid: $rid})-[:LINK {tag: $tag}]->(target)
+                MATCH (object:object {rid: $rid})-[:LINK {tag: $tag}]->(target)
                 RETURN target.rid AS target
                 """
             
@@ -73,7 +78,7 @@ class GraphBaseInterface:
         @driver.execute_write
         def execute_delete(tx: ManagedTransaction):
             DELETE_OBJECT = """//cypher
-                MATCH (object {rid: $rid})
+                MATCH (object:object {rid: $rid})
                 DETACH DELETE object
                 RETURN object
                 """
@@ -21,8 +21,8 @@ class GraphLinkInterface(GraphBaseInterface):
         @driver.execute_write
         def execute_create(tx: ManagedTransaction, source, target, tag):
             CREATE_LINK = """//cypher
-                MATCH (source {rid: $source_rid})
-                MATCH (target {rid: $target_rid})
+                MATCH (source:object {rid: $source_rid})
+                MATCH (target:object {rid: $target_rid})
                 MERGE (source)-[link:LINK {rid: $rid}]->(target)
                 SET link += $params
                 RETURN link
@@ -0,0 +1,123 @@
+from neo4j import ManagedTransaction, exceptions
+from rid_lib.core import RID
+
+from . import driver
+
+
+# label shared by all RID graph objects, queries in koi/graph match
+# objects by rid with this label so lookups use its uniqueness constraint
+BASE_LABEL = "object"
+LABEL_BATCH_SIZE = 10_000
+
+
+def schema_statements() -> list[str]:
+    """Returns Cypher statements creating the graph's constraints and indexes.
+
+    RIDs are unique across all graph objects, enforced (and indexed) by
+    a constraint on the base label. Objects are also labeled with their
+    RID's space and format (see GraphBaseInterface.create), which are
+    indexed for every RID type known to RID.table, and links are indexed
+    by rid as well.
+    """
+    statements = [
+        f"CREATE CONSTRAINT {BASE_LABEL}_rid IF NOT EXISTS "
+        f"FOR (n:{BASE_LABEL}) REQUIRE n.rid IS UNIQUE",
+        "CREATE INDEX link_relationship_rid IF NOT EXISTS "
+        "FOR ()-[link:LINK]-() ON (link.rid)"
+    ]
+
+    labels = sorted({
+        label
+        for Type in RID.table.values()
+        for label in (Type.space, Type.format)
+    })
+    for label in labels:
+        statements.append(
+            f"CREATE INDEX `{label}_label_rid` IF NOT EXISTS "
+            f"FOR (n:`{label}`) ON (n.rid)"
+        )
+    return statements
+
+def create_schema() -> bool:
+    """Creates missing constraints and indexes, existing ones are kept.
+
+    Statements which fail (e.g. the uniqueness constraint, if objects
+    still share a rid) are reported and skipped, the rest are created.
+    Returns True if all statements succeeded.
+    """
+    @driver.execute_write
+    def execute_schema(tx: ManagedTransaction, statement: str):
+        tx.run(statement)
+
+    # schema changes can't be mixed with other statements in a transaction
+    succeeded = True
+    for statement in schema_statements():
+        try:
+            execute_schema(statement)
+        except exceptions.Neo4jError as error:
+            print(f"Failed to run schema statement '{statement}': {error}")
+            succeeded = False
+    return succeeded
+
+def label_objects() -> int:
+    """Adds the base label to graph objects created without it.
+
+    Objects created before the schema existed were only labeled with
+    their space and format. Only one object is labeled per rid: objects
+    are grouped by rid before labeling, so unlabeled duplicates aren't
+    labeled together, and objects whose rid already belongs to a labeled
+    object are skipped. Labeling duplicates would violate the uniqueness
+    constraint, they are left unlabeled and reported. Returns the number
+    of objects labeled.
+    """
+    @driver.execute_write
+    def execute_label(tx: ManagedTransaction):
+        LABEL_OBJECTS = f"""//cypher
+            MATCH (object)
+            WHERE object.rid IS NOT NULL AND NOT object:{BASE_LABEL}
+                AND NOT EXISTS {{
+                    MATCH (other:{BASE_LABEL} {{rid: object.rid}})
+                }}
+            WITH object.rid AS rid, head(collect(object)) AS first
+            LIMIT $batch_size
+            SET first:{BASE_LABEL}
+            RETURN count(first) AS labeled
+            """
+
+        record = tx.run(LABEL_OBJECTS, batch_size=LABEL_BATCH_SIZE).single()
+        return record["labeled"]
+
+    @driver.execute_read
+    def execute_count_unlabeled(tx: ManagedTransaction):
+        COUNT_UNLABELED = f"""//cypher
+            MATCH (object)
+            WHERE object.rid IS NOT NULL AND NOT object:{BASE_LABEL}
+            RETURN count(object) AS unlabeled
+            """
+
+        return tx.run(COUNT_UNLABELED).single()["unlabeled"]
+
+    # labels in batches to keep transactions small
+    num_labeled = 0
+    while (labeled := execute_label()) > 0:
+        num_labeled += labeled
+        print(f"labeled {num_labeled} graph objects")
+
+    num_unlabeled = execute_count_unlabeled()
+    if num_unlabeled:
+        print(f"{num_unlabeled} graph objects duplicate the rid of a labeled "
+            "object and were left unlabeled")
+    return num_labeled
+
+def migrate():
+    """Labels existing graph objects, then creates the schema.
+
+    Run when the API server starts. Objects must be labeled before the
+    uniqueness constraint exists, otherwise queries matching on the
+    base label would create duplicates of unlabeled objects. A failure
+    to create the schema is reported rather than raised, so the server
+    still starts (with lookups by rid unindexed).
+    """
+    label_objects()
+    if not create_schema():
+        print("Graph schema is incomplete, see the errors above")
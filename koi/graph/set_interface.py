@@ -25,11 +25,12 @@ class GraphSetInterface(GraphBaseInterface):
         """Creates a new link RID graph object."""
         @driver.execute_write
         def execute_create(tx: ManagedTransaction, members):
-            CREATE_SET = """//cypher
-                MERGE (s:set {rid: $rid})
+            CREATE_SET = f"""//cypher
+                MERGE (s:object {{rid: $rid}})
+                SET s:{self.rid.space}:{self.rid.format}
                 SET s += $params
                 WITH s UNWIND $member_rids AS member_rid
-                MATCH (member {rid: member_rid})
+                MATCH (member:object {{rid: member_rid}})
                 MERGE (s)-[:CONTAINS]->(member)
                 RETURN member.rid
                 """
@@ -41,10 +42,9 @@ class GraphSetInterface(GraphBaseInterface):
                 params=self.rid.params
             )
 
-            return [
-                RID.from_string(record["member.rid"])
-                for record in member_records
-            ]
+            return RID.from_strings(
+                [record["member.rid"] for record in member_records]
+            )
         
         return execute_create(utils.serialize_rids(members))
 
@@ -53,14 +53,14 @@ class GraphSetInterface(GraphBaseInterface):
         @driver.execute_read
         def execute_read(tx: ManagedTransaction):
             READ_SET = """//cypher
-                MATCH (s:set {rid: $rid})
+                MATCH (s:object:set {rid: $rid})
                 OPTIONAL MATCH (s)-[:CONTAINS]->(member)
                 RETURN s.rid, collect(member.rid) AS members
                 """
             
             record = tx.run(READ_SET, rid=str(self.rid)).single()
             if record:
-                return [RID.from_string(member) for member in record["members"]]
+                return RID.from_strings(record["members"])
             else:
                 return None
         return execute_read()
@@ -77,7 +77,7 @@ class GraphSetInterface(GraphBaseInterface):
             removed_members = []
 
             CHECK_EXISTENCE = """//cypher
-                MATCH (s:set {rid: $rid})
+                MATCH (s:object:set {rid: $rid})
                 RETURN s
                 """
             
@@ -87,9 +87,9 @@ class GraphSetInterface(GraphBaseInterface):
 
             if add_members:
                 ADD_MEMBERS = """//cypher
-                    MATCH (s:set {rid: $rid})
+                    MATCH (s:object:set {rid: $rid})
                     UNWIND $member_rids AS member_rid  
-                    MATCH (member {rid: member_rid})  
+                    MATCH (member:object {rid: member_rid})  
                     MERGE (s)-[:CONTAINS]->(member)
                     RETURN member.rid
                     """
@@ -107,9 +107,9 @@ class GraphSetInterface(GraphBaseInterface):
             
             if remove_members:
                 REMOVE_MEMBERS = """//cypher
-                    MATCH (s:set {rid: $rid})
+                    MATCH (s:object:set {rid: $rid})
                     UNWIND $member_rids AS member_rid
-                    MATCH (s)-[edge:CONTAINS]->(member {rid: member_rid})
+                    MATCH (s)-[edge:CONTAINS]->(member:object {rid: member_rid})
                     DELETE edge
                     RETURN member.rid
                     """
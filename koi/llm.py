@@ -58,9 +58,7 @@ def continue_conversation(conversation_id, query):
 
     print(vector_queries)
 
-    vectors = set()
-    for vector_query in vector_queries:
-        vectors.update(VectorInterface.query(vector_query, top_k=7))
+    vectors = VectorInterface.query_many(vector_queries, top_k=7)
                 
     # removes duplicates in the case of multiple chunks from the same document
     unique_vector_rids = []
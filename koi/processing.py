@@ -0,0 +1,117 @@
+import multiprocessing, threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+from html2text import html2text
+
+from koi.config import (
+    PROCESSING_WORKERS,
+    PROCESSING_MAX_IN_FLIGHT,
+    PROCESSING_MIN_HTML_SIZE
+)
+
+
+# forking a process running other threads (server threads, the embedding
+# worker) can deadlock the child, workers are started from a fresh process
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn"
+)
+
+class ProcessingPool:
+    """Process pool for CPU bound ingestion work.
+
+    Converting HTML to text and chunking text are pure Python, so when
+    run in request threads they compete for the GIL. Submitting them to
+    the pool runs them in worker processes instead, in parallel across
+    cores. At most 'max_in_flight' calls are pending at a time (across
+    all threads), submitting more blocks until one finishes, which bounds
+    the memory held by queued arguments and results.
+
+    Example:
+        text = processing_pool.run(html2text, html, bodywidth=0)
+        for offsets in processing_pool.imap(chunk_offsets, args):
+            ...
+
+    Functions and arguments must be picklable, and importable by fresh
+    worker processes without side effects (e.g. chunk_offsets lives in
+    koi/chunker.py, outside of the vectorstore package). With
+    'max_workers' set to 0, calls run in the calling thread instead.
+    The worker processes are started on first use, from a forkserver
+    (or spawned) rather than forked, so scripts using the pool must
+    guard their entry point with 'if __name__ == "__main__":'.
+    """
+
+    def __init__(self, max_workers: int, max_in_flight: int):
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight, 1)
+        self.slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.executor: ProcessPoolExecutor | None = None
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context(START_METHOD)
+                )
+            return self.executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        if self.max_workers == 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self.slots.acquire()
+        try:
+            future = self.get_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Runs a function in a worker process and returns its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def imap(self, fn: Callable, args: Iterable[tuple]) -> Iterator:
+        """Yields fn(*a) for each tuple in args, in order.
+
+        Calls are submitted ahead of the results being consumed, up to
+        the in flight limit.
+        """
+        pending = deque()
+        for call_args in args:
+            if len(pending) >= self.max_in_flight:
+                yield pending.popleft().result()
+            pending.append(self.submit(fn, *call_args))
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+processing_pool = ProcessingPool(PROCESSING_WORKERS, PROCESSING_MAX_IN_FLIGHT)
+
+def html_to_text(html: str, **options) -> str:
+    """Converts HTML to text with html2text.
+
+    Large documents are converted in the processing pool. Small ones
+    take a few milliseconds, and are converted in the calling thread
+    rather than starting the pool's workers (e.g. for a single page
+    dereferenced by a script) and copying them to a worker.
+    """
+    if len(html) < PROCESSING_MIN_HTML_SIZE:
+        return html2text(html, **options)
+    return processing_pool.run(html2text, html, **options)
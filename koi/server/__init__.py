@@ -1,6 +1,11 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
 import logging
 
+from koi.graph import schema
+from koi.processing import processing_pool
+from koi.vectorstore import VectorInterface
+
 from .routers import (
     conversation,
     knowledge_object,
@@ -8,7 +13,18 @@ from .routers import (
     set
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # labels existing objects before constraining them
+    schema.migrate()
+    # request handlers only queue vectors, embedding happens in the worker
+    VectorInterface.worker.start()
+    yield
+    VectorInterface.worker.stop()
+    VectorInterface.backend.close()
+    processing_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(knowledge_object.router)
 app.include_router(set.router)
 app.include_router(link.router)
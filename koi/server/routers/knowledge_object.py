@@ -1,11 +1,19 @@
-from fastapi import APIRouter
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import nanoid
-from rid_lib.core import DataObject
+from rid_lib.core import RID, DataObject
+from rid_lib.exceptions import RidException
 from rid_lib.spaces.koi import KoiLink, KoiSet
 
+from koi.cache import CacheInterface
+from koi.config import DEREFERENCE_THREADS
 from koi.exceptions import ResourceNotFoundError
 from koi.validators import RIDField
+from koi.vectorstore import VectorInterface
 from koi import utils
 
 
@@ -51,19 +59,43 @@ class CreateObjects(BaseModel):
 @router.post("/objects")
 def create_objects(knowledge_objs: CreateObjects):
     """Observes multiple RID objects."""
-    objects = {}
-    for rid, data in knowledge_objs.rids.items():
-        objects[str(rid)] = create_object(
-            CreateObject(
-                rid, 
-                data, 
-                knowledge_objs.use_dereference, 
-                knowledge_objs.overwrite, 
-                knowledge_objs.embed
-            )
-        )
+    rids = list(knowledge_objs.rids)
+    for rid in rids:
+        rid.graph.create()
+
+    cached_objects = dict(zip(rids, CacheInterface.read_many(rids)))
 
-    return objects
+    data_objects = {}
+    to_dereference = []
+    for rid, cached_object in cached_objects.items():
+        if cached_object and not knowledge_objs.overwrite:
+            continue
+
+        data_object = DataObject(json_data=knowledge_objs.rids[rid])
+        if data_object:
+            data_objects[rid] = data_object
+        elif knowledge_objs.use_dereference:
+            to_dereference.append(rid)
+
+    # dereferencing is mostly waiting on requests, large HTML documents
+    # are converted in the processing pool
+    with ThreadPoolExecutor(max_workers=DEREFERENCE_THREADS) as executor:
+        data_objects.update(zip(
+            to_dereference,
+            executor.map(lambda rid: rid.dereference(), to_dereference)
+        ))
+
+    print(f"writing cache for {len(data_objects)} objects")
+    cached_objects.update(
+        zip(data_objects, CacheInterface.write_many(data_objects)))
+
+    if knowledge_objs.embed:
+        VectorInterface.embed_many(rids)
+
+    return {
+        str(rid): cached_object.to_dict()
+        for rid, cached_object in cached_objects.items()
+    }
 
 
 class ReadObject(BaseModel):
@@ -75,6 +107,59 @@ def read_object(knowledge_obj: ReadObject):
     rid = knowledge_obj.rid
     return rid.cache.read().json_data
 
+@router.get("/object/file")
+def read_object_file(
+    rid: str, 
+    file_name: str, 
+    range: str | None = Header(default=None)
+):
+    """Streams a cached file of RID object, supports range requests.
+
+    Parameters are passed in the query string (rather than the request
+    body) so files can be served directly to browsers and media players.
+    """
+    try:
+        rid = RID.from_string(rid)
+    except RidException as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+
+    file_size = rid.cache.file_size(file_name)
+    if file_size is None:
+        raise ResourceNotFoundError(
+            rid, detail=f"{rid} has no cached file '{file_name}'")
+    
+    headers = {"Accept-Ranges": "bytes"}
+    status_code = status.HTTP_200_OK
+    start, end = 0, file_size
+
+    if range:
+        try:
+            byte_range = utils.parse_byte_range(range, file_size)
+        except ValueError as error:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail=str(error),
+                headers={"Content-Range": f"bytes */{file_size}"}
+            )
+        
+        if byte_range:
+            start, end = byte_range
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {start}-{end-1}/{file_size}"
+
+    headers["Content-Length"] = str(end - start)
+    media_type = mimetypes.guess_type(file_name)[0]
+
+    return StreamingResponse(
+        rid.cache.iter_file(file_name, start, end),
+        status_code=status_code,
+        media_type=media_type or "application/octet-stream",
+        headers=headers
+    )
+
 # @router.get("/{encoded_id:path}")
 # def read_object_path(encoded_id: str):
 #     return encoded_id
@@ -6,6 +6,9 @@ from base64 import urlsafe_b64encode, urlsafe_b64decode
 from rid_lib.core import RID, DataObject
 
 
+HASH_BUFFER_SIZE = 64 * 1024
+
+
 def encode_b64(string: str):
     encoded_bytes = urlsafe_b64encode(string.encode())
     encoded_string = encoded_bytes.decode()
@@ -20,15 +23,103 @@ def decode_b64(string: str):
     decoded_string = decoded_bytes.decode()
     return decoded_string
 
+def hash_string(string: str):
+    return hashlib.sha256(string.encode()).hexdigest()
+
+# encodes dicts to JSON in a repeatable way, identical to 
+# json.dumps(data, sort_keys=True)
+canonical_json_encoder = json.JSONEncoder(sort_keys=True)
+
 def hash_json(data: dict):
-    # converting dict to string in a repeatable way
-    json_string = json.dumps(data, sort_keys=True)
-    json_bytes = json_string.encode()
+    """Returns SHA-256 hash of the canonical JSON encoding of data.
+
+    Data is encoded with the C encoder, and hashed in slices of
+    HASH_BUFFER_SIZE characters instead of being encoded to bytes as a
+    whole. Dicts with large string values (e.g. the text of a page) are
+    encoded one item at a time, so the JSON string of the whole object
+    is never built and only the encoded text and one slice are held in
+    memory.
+    """
+    hash = hashlib.sha256()
+    if not (
+        isinstance(data, dict) and
+        all(type(key) is str for key in data) and
+        any(
+            type(value) is str and len(value) > HASH_BUFFER_SIZE
+            for value in data.values()
+        )
+    ):
+        update_hash(hash, canonical_json_encoder.encode(data))
+        return hash.hexdigest()
+
+    hash.update(b"{")
+    for i, key in enumerate(sorted(data)):
+        if i:
+            hash.update(b", ")
+        hash.update(canonical_json_encoder.encode(key).encode())
+        hash.update(b": ")
+        update_hash(hash, canonical_json_encoder.encode(data[key]))
+    hash.update(b"}")
+    return hash.hexdigest()
 
+def update_hash(hash, string: str):
+    """Feeds a string to a hash in bounded slices."""
+    for start in range(0, len(string), HASH_BUFFER_SIZE):
+        hash.update(string[start:start + HASH_BUFFER_SIZE].encode())
+
+def hash_files(files: dict[str, bytes | str]):
+    """Returns SHA-256 hash of file names and contents."""
     hash = hashlib.sha256()
-    hash.update(json_bytes)
+    for file_name in sorted(files):
+        content = files[file_name]
+        if type(content) is str:
+            content = content.encode()
+
+        # length prefixes keep name/content boundaries unambiguous
+        name_bytes = file_name.encode()
+        hash.update(len(name_bytes).to_bytes(8, "big"))
+        hash.update(name_bytes)
+        hash.update(len(content).to_bytes(8, "big"))
+        hash.update(content)
     return hash.hexdigest()
 
+def parse_byte_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """Parses an HTTP Range header into (start, end) byte offsets.
+
+    The end offset is exclusive. Returns None if the header should be
+    ignored (not a single, syntactically valid byte range, as per RFC
+    9110), raises ValueError if the range can't be satisfied by a file
+    of the given size.
+    """
+    unit, _, byte_range = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in byte_range:
+        return None
+    
+    first, dash, last = byte_range.strip().partition("-")
+    if not dash or not (first or last) or not all(
+        position.isascii() and position.isdigit()
+        for position in (first, last) if position
+    ):
+        return None
+
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = int(last) + 1 if last else size
+    else:
+        # suffix range, the last n bytes
+        start = max(0, size - int(last))
+        end = size
+        if int(last) == 0:
+            raise ValueError(f"Range '{range_header}' not satisfiable")
+
+    end = min(end, size)
+    if start >= end:
+        raise ValueError(f"Range '{range_header}' not satisfiable")
+
+    return start, end
+
 def serialize_rids(obj):
     """Recursively replaces all RID objects with strings in dict or list."""
     if isinstance(obj, dict):
@@ -41,18 +132,31 @@ def serialize_rids(obj):
         return obj
 
 def generate_metadata(rid: RID, data_object: DataObject):
+    """Generates cache metadata for a DataObject.
+
+    Hashes are stored on the DataObject after they are first computed,
+    so metadata for the same object (e.g. when it is written to the 
+    cache and then embedded) is only hashed once. DataObjects shouldn't
+    be modified after metadata is generated.
+    """
+    if data_object.sha256_hash is None:
+        data_object.sha256_hash = hash_json(data_object.json_data or {})
+
     metadata = {
         "rid": str(rid),
         "space": rid.space,
         "format": rid.format,
         "timestamp": time.time(),
-        "sha256_hash": hash_json(
-            data_object.json_data or {}
-        ),
+        "sha256_hash": data_object.sha256_hash,
         "files": list(data_object.files.keys()) if data_object.files else []
     }
 
-    if "text" in data_object.json_data:
+    if data_object.files:
+        if data_object.files_sha256_hash is None:
+            data_object.files_sha256_hash = hash_files(data_object.files)
+        metadata["files_sha256_hash"] = data_object.files_sha256_hash
+
+    if "text" in (data_object.json_data or {}):
         metadata["character_length"] = len(data_object.json_data["text"])
     
     return metadata
\ No newline at end of file
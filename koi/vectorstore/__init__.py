@@ -1,2 +1,2 @@
 from .interface import VectorInterface
-from .object_model import VectorObject
\ No newline at end of file
+from .object_model import VectorObject, VectorMetadata
\ No newline at end of file
@@ -0,0 +1,676 @@
+import os, json, time, atexit, shutil, sqlite3, threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    from pinecone import Pinecone, ServerlessSpec
+except ImportError:
+    Pinecone = ServerlessSpec = None
+
+from koi.config import (
+    PINECONE_API_KEY,
+    PINECONE_INDEX_NAME,
+    PINECONE_CLOUD_PROVIDER,
+    PINECONE_CLOUD_REGION,
+    PINECONE_INDEX_METRIC,
+    PINECONE_BATCH_SIZE,
+    EMBEDDINGS_DIMENSION
+)
+
+
+def require(module, name: str):
+    if module is None:
+        raise ImportError(
+            f"Vector backend requires '{name}', but it is not installed")
+    return module
+
+
+class VectorBackend(ABC):
+    """Storage and search backend for embedded vectors.
+
+    Vectors are dicts with "id", "values", and "metadata" fields, as
+    returned by Pinecone, and query results additionally have a "score"
+    (cosine similarity). The active backend is selected with
+    VECTOR_BACKEND in koi.config and bound to VectorInterface.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: list[tuple[str, list[float], dict]]) -> None:
+        """Writes (id, values, metadata) tuples, replacing existing ids."""
+        ...
+
+    @abstractmethod
+    def fetch(self, ids: list[str]) -> dict[str, dict]:
+        """Returns vector dicts by id, missing ids are left out."""
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        vector: list[float],
+        top_k: int,
+        filter: dict | None = None
+    ) -> list[dict]:
+        """Returns the top_k most similar vectors matching the filter.
+
+        Filters use Pinecone's metadata filter syntax, e.g.
+        {"character_length": {"$gt": 200}}. Results don't include
+        vector values.
+        """
+        ...
+
+    def query_many(
+        self,
+        vectors: list[list[float]],
+        top_k: int,
+        filter: dict | None = None
+    ) -> list[list[dict]]:
+        """Returns query results for each of a batch of vectors."""
+        return [self.query(vector, top_k, filter) for vector in vectors]
+
+    @abstractmethod
+    def list_ids(self) -> Iterator[list[str]]:
+        """Yields the ids of all stored vectors, in batches."""
+        ...
+
+    @abstractmethod
+    def delete(self, ids: list[str]) -> None:
+        ...
+
+    @abstractmethod
+    def drop(self) -> None:
+        """Deletes all vectors."""
+        ...
+
+    def close(self) -> None:
+        """Persists any pending state, called on shutdown."""
+        pass
+
+
+class PineconeBackend(VectorBackend):
+    """Serverless Pinecone index, created if missing.
+
+    The index is checked (and created) when the backend is constructed,
+    the first time VectorInterface.backend is used (see LazyBackend).
+    """
+
+    def __init__(
+            self,
+            api_key: str = PINECONE_API_KEY,
+            index_name: str = PINECONE_INDEX_NAME,
+            dimension: int = EMBEDDINGS_DIMENSION
+        ):
+        client = require(Pinecone, "pinecone-client")(api_key=api_key)
+
+        # creates serverless index if it doesn't exist yet
+        if index_name not in client.list_indexes().names():
+            client.create_index(
+                name=index_name,
+                dimension=dimension,
+                spec=ServerlessSpec(
+                    cloud=PINECONE_CLOUD_PROVIDER,
+                    region=PINECONE_CLOUD_REGION
+                ),
+                metric=PINECONE_INDEX_METRIC
+            )
+
+        self.index = client.Index(index_name)
+
+    def upsert(self, vectors):
+        self.index.upsert(vectors=vectors, batch_size=PINECONE_BATCH_SIZE)
+
+    def fetch(self, ids):
+        return self.index.fetch(ids)["vectors"]
+
+    def query(self, vector, top_k, filter=None):
+        return self.index.query(
+            vector=vector,
+            filter=filter,
+            top_k=top_k,
+            include_metadata=True
+        )["matches"]
+
+    def query_many(self, vectors, top_k, filter=None):
+        # Pinecone queries one vector per request, requests are concurrent
+        with ThreadPoolExecutor(max_workers=len(vectors) or 1) as executor:
+            return list(executor.map(
+                lambda vector: self.query(vector, top_k, filter), vectors))
+
+    def list_ids(self):
+        # paginated, only supported by serverless indexes
+        yield from self.index.list()
+
+    def delete(self, ids):
+        if ids:
+            self.index.delete(ids=ids)
+
+    def drop(self):
+        self.index.delete(delete_all=True)
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class MetadataColumn:
+    """Values of one metadata field for all rows of a LocalBackend.
+
+    Lets metadata filters be evaluated for every row at once, as numpy
+    masks. Values are kept as an object array, numeric values also as a
+    float array (NaN where missing or not a number), alongside a mask of
+    rows where the field exists.
+    """
+
+    COMPARISONS = {
+        "$gt": np.greater,
+        "$gte": np.greater_equal,
+        "$lt": np.less,
+        "$lte": np.less_equal
+    } if np is not None else {}
+
+    def __init__(self, key: str, row_metadata: list[dict | None], capacity: int):
+        self.key = key
+        self.values = np.empty(capacity, dtype=object)
+        self.numbers = np.full(capacity, np.nan)
+        self.exists = np.zeros(capacity, dtype=bool)
+        for row, metadata in enumerate(row_metadata):
+            self.set(row, metadata)
+
+    def set(self, row: int, metadata: dict | None):
+        if metadata is None or self.key not in metadata:
+            self.values[row] = None
+            self.numbers[row] = np.nan
+            self.exists[row] = False
+        else:
+            value = metadata[self.key]
+            self.values[row] = value
+            self.numbers[row] = value if is_number(value) else np.nan
+            self.exists[row] = True
+
+    def equals(self, operand) -> np.ndarray:
+        if is_number(operand):
+            return self.numbers == operand
+        return self.exists & np.equal(self.values, operand).astype(bool)
+
+    def mask(self, op: str, operand) -> np.ndarray:
+        """Returns mask of rows matching a Pinecone filter operator."""
+        if op == "$exists":
+            return self.exists if operand else ~self.exists
+        elif op == "$eq":
+            return self.equals(operand)
+        elif op == "$ne":
+            return ~self.equals(operand)
+        elif op in ("$in", "$nin"):
+            mask = np.zeros(len(self.values), dtype=bool)
+            for value in operand:
+                mask |= self.equals(value)
+            return mask if op == "$in" else ~mask
+        elif op in self.COMPARISONS:
+            if not is_number(operand):
+                raise ValueError(
+                    f"Metadata filter operator '{op}' requires a number")
+            # NaN (missing or non-numeric) values never match
+            return self.COMPARISONS[op](self.numbers, operand)
+        raise ValueError(f"Unsupported metadata filter operator '{op}'")
+
+
+class LocalBackend(VectorBackend):
+    """Vectors stored on local disk, searched exactly or with HNSW.
+
+    Vector values are rows of a memory-mapped float32 matrix
+    (vectors.f32), and ids and metadata are stored in an SQLite database
+    (vectors.db) mapping each id to its row. Rows of deleted vectors
+    are reused. Similarity is cosine, like the Pinecone index.
+
+    Metadata filters are evaluated up front for all rows, using numpy
+    column arrays of the filtered fields (see MetadataColumn), and the
+    resulting mask restricts the search. With 'search' set to "exact"
+    (the default), queries are scored against every matching row with a
+    single matrix multiplication, which is fast and exact up to a few
+    hundred thousand vectors. Multiple queries are scored together.
+
+    With 'search' set to "approximate", queries use an hnswlib index
+    (index.hnsw), kept in memory and saved at most every
+    INDEX_SAVE_INTERVAL seconds while written to, and on close (or
+    exit). Every write increments a version stored with the vectors,
+    and the index is rebuilt on load if it is missing or was saved at
+    an older version (e.g. after a crash). Queries fall back to exact search if the index can't
+    return enough results for a restrictive filter. Requires numpy, and
+    hnswlib for approximate search.
+    """
+
+    # HNSW graph degree, and candidate list sizes at build and query time
+    INDEX_M = 16
+    INDEX_EF_CONSTRUCTION = 200
+    INDEX_EF = 64
+    MIN_CAPACITY = 1024
+    INDEX_SAVE_INTERVAL = 60
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vectors (
+            row INTEGER PRIMARY KEY,
+            id TEXT UNIQUE NOT NULL,
+            metadata TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        """
+
+    def __init__(
+            self,
+            directory: str,
+            dimension: int = EMBEDDINGS_DIMENSION,
+            search: str = "exact"
+        ):
+        require(np, "numpy")
+        if search not in ("exact", "approximate"):
+            raise ValueError(
+                f"Unknown vector search '{search}', must be one of: "
+                "'exact', 'approximate'")
+        if search == "approximate":
+            require(hnswlib, "hnswlib")
+
+        self.directory = directory
+        self.dimension = dimension
+        self.search = search
+        self.matrix_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.hnsw")
+        self.lock = threading.RLock()
+        self.load()
+        atexit.register(self.close)
+
+    def load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.connection = sqlite3.connect(
+            os.path.join(self.directory, "vectors.db"),
+            check_same_thread=False
+        )
+        self.connection.executescript(self.SCHEMA)
+
+        self.rows: dict[str, int] = {}
+        self.row_ids: list[str | None] = []
+        self.row_metadata: list[dict | None] = []
+        for row, vector_id, metadata in self.connection.execute(
+            "SELECT row, id, metadata FROM vectors ORDER BY row"
+        ):
+            self.extend_rows(row + 1)
+            self.rows[vector_id] = row
+            self.row_ids[row] = vector_id
+            self.row_metadata[row] = json.loads(metadata)
+
+        self.free_rows = [
+            row for row, vector_id in enumerate(self.row_ids)
+            if vector_id is None
+        ]
+
+        if not os.path.exists(self.matrix_path):
+            open(self.matrix_path, "wb").close()
+        self.capacity = os.path.getsize(self.matrix_path) // (self.dimension * 4)
+        self.matrix = None
+        self.map_matrix()
+
+        used_rows = list(self.rows.values())
+        self.live = np.zeros(self.capacity, dtype=bool)
+        self.live[used_rows] = True
+        self.inverse_norms = np.zeros(self.capacity, dtype=np.float32)
+        self.set_norms(used_rows)
+        self.columns: dict[str, MetadataColumn] = {}
+
+        self.version = self.get_state("version")
+        self.index = None
+        self.index_dirty = False
+        self.index_saved_at = time.monotonic()
+        if self.search == "approximate":
+            self.index = hnswlib.Index(space="cosine", dim=self.dimension)
+            if (
+                os.path.exists(self.index_path) and
+                self.get_state("index_version") == self.version
+            ):
+                self.index.load_index(
+                    self.index_path, max_elements=max(self.capacity, 1))
+            else:
+                self.build_index()
+            self.index.set_ef(self.INDEX_EF)
+        elif os.path.exists(self.index_path):
+            # writes made during exact search aren't indexed
+            os.remove(self.index_path)
+
+    def extend_rows(self, length: int):
+        while len(self.row_ids) < length:
+            self.row_ids.append(None)
+            self.row_metadata.append(None)
+
+    def map_matrix(self):
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+        self.matrix = np.memmap(
+            self.matrix_path, dtype=np.float32, mode="r+",
+            shape=(self.capacity, self.dimension)
+        ) if self.capacity else np.zeros((0, self.dimension), np.float32)
+
+    def set_norms(self, rows: list[int]):
+        norms = np.linalg.norm(self.matrix[rows], axis=1)
+        self.inverse_norms[rows] = 1 / np.maximum(norms, 1e-12)
+
+    def grow(self, length: int):
+        """Extends the matrix file (and index) to hold 'length' rows."""
+        if length <= self.capacity:
+            return
+        capacity = max(self.MIN_CAPACITY, self.capacity * 2, length)
+        with open(self.matrix_path, "r+b") as f:
+            f.truncate(capacity * self.dimension * 4)
+
+        self.live = np.concatenate([
+            self.live, np.zeros(capacity - self.capacity, dtype=bool)])
+        self.inverse_norms = np.concatenate([
+            self.inverse_norms,
+            np.zeros(capacity - self.capacity, dtype=np.float32)
+        ])
+        # rebuilt at the new size when next used
+        self.columns.clear()
+
+        self.capacity = capacity
+        self.map_matrix()
+        if self.index is not None:
+            self.index.resize_index(capacity)
+
+    def build_index(self):
+        self.index.init_index(
+            max_elements=max(self.capacity, 1),
+            M=self.INDEX_M,
+            ef_construction=self.INDEX_EF_CONSTRUCTION
+        )
+        used_rows = list(self.rows.values())
+        if used_rows:
+            self.index.add_items(self.matrix[used_rows], used_rows)
+        self.save_index()
+
+    def get_state(self, key: str) -> int:
+        row = self.connection.execute(
+            "SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def set_state(self, key: str, value: int):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO state VALUES (?, ?)", (key, value))
+
+    def save_index(self):
+        """Saves the index, recording the version of the vectors it holds."""
+        temporary_path = self.index_path + ".tmp"
+        self.index.save_index(temporary_path)
+        os.replace(temporary_path, self.index_path)
+        with self.connection:
+            self.set_state("index_version", self.version)
+        self.index_dirty = False
+        self.index_saved_at = time.monotonic()
+
+    def index_written(self):
+        """Saves the index after a write, at most every save interval."""
+        self.index_dirty = True
+        if time.monotonic() - self.index_saved_at >= self.INDEX_SAVE_INTERVAL:
+            self.save_index()
+
+    def column(self, key: str) -> MetadataColumn:
+        if key not in self.columns:
+            self.columns[key] = MetadataColumn(
+                key, self.row_metadata, self.capacity)
+        return self.columns[key]
+
+    def filter_mask(self, filter: dict | None) -> np.ndarray:
+        """Returns mask of stored rows matching a metadata filter."""
+        mask = self.live.copy()
+        for key, condition in (filter or {}).items():
+            if key == "$and":
+                for subfilter in condition:
+                    mask &= self.filter_mask(subfilter)
+            elif key == "$or":
+                any_mask = np.zeros(self.capacity, dtype=bool)
+                for subfilter in condition:
+                    any_mask |= self.filter_mask(subfilter)
+                mask &= any_mask
+            elif isinstance(condition, dict):
+                column = self.column(key)
+                for op, operand in condition.items():
+                    mask &= column.mask(op, operand)
+            else:
+                mask &= self.column(key).equals(condition)
+        return mask
+
+    def upsert(self, vectors):
+        if not vectors:
+            return
+
+        with self.lock:
+            rows = []
+            for vector_id, _, metadata in vectors:
+                row = self.rows.get(vector_id)
+                if row is None:
+                    if self.free_rows:
+                        row = self.free_rows.pop()
+                    else:
+                        row = len(self.row_ids)
+                        self.extend_rows(row + 1)
+                    self.rows[vector_id] = row
+                    self.row_ids[row] = vector_id
+                self.row_metadata[row] = metadata
+                rows.append(row)
+
+            self.grow(len(self.row_ids))
+            values = np.asarray(
+                [values for _, values, _ in vectors], dtype=np.float32)
+            self.matrix[rows] = values
+            self.matrix.flush()
+
+            self.live[rows] = True
+            self.set_norms(rows)
+            for column in self.columns.values():
+                for row in rows:
+                    column.set(row, self.row_metadata[row])
+
+            self.version += 1
+            with self.connection:
+                self.set_state("version", self.version)
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)",
+                    [
+                        (row, vector_id, json.dumps(metadata))
+                        for row, (vector_id, _, metadata) in zip(rows, vectors)
+                    ]
+                )
+
+            if self.index is not None:
+                self.index.add_items(values, rows)
+                self.index_written()
+
+    def fetch(self, ids):
+        with self.lock:
+            return {
+                vector_id: {
+                    "id": vector_id,
+                    "values": self.matrix[row].tolist(),
+                    "metadata": self.row_metadata[row]
+                }
+                for vector_id in ids
+                if (row := self.rows.get(vector_id)) is not None
+            }
+
+    def query(self, vector, top_k, filter=None):
+        return self.query_many([vector], top_k, filter)[0]
+
+    def query_many(self, vectors, top_k, filter=None):
+        with self.lock:
+            if not self.rows or top_k <= 0:
+                return [[] for _ in vectors]
+
+            queries = np.asarray(vectors, dtype=np.float32).reshape(
+                len(vectors), self.dimension)
+            mask = self.filter_mask(filter)
+
+            if self.index is not None:
+                results = [
+                    self.query_index(query, top_k, mask if filter else None)
+                    for query in queries
+                ]
+                missing = [
+                    i for i, matches in enumerate(results) if matches is None
+                ]
+                if missing:
+                    for i, matches in zip(
+                        missing, self.query_exact(queries[missing], top_k, mask)
+                    ):
+                        results[i] = matches
+            else:
+                results = self.query_exact(queries, top_k, mask)
+
+            return [
+                [
+                    {
+                        "id": self.row_ids[row],
+                        "score": score,
+                        "metadata": self.row_metadata[row]
+                    }
+                    for row, score in matches
+                ]
+                for matches in results
+            ]
+
+    def query_index(self, query, top_k, mask) -> list | None:
+        """Returns (row, score) pairs, or None if the index falls short."""
+        k = min(top_k, len(self.rows) if mask is None else int(mask.sum()))
+        if k == 0:
+            return []
+        self.index.set_ef(max(self.INDEX_EF, k))
+        try:
+            labels, distances = self.index.knn_query(
+                query, k=k,
+                filter=(lambda row: bool(mask[row])) if mask is not None else None
+            )
+        except RuntimeError:
+            # fewer than k (filtered) results were found
+            return None
+        return [
+            (int(row), 1.0 - float(distance))
+            for row, distance in zip(labels[0], distances[0])
+        ]
+
+    def query_exact(self, queries, top_k, mask) -> list[list]:
+        """Returns (row, score) pairs for each query, scoring every row."""
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return [[] for _ in queries]
+
+        # gathering rows copies them, so when most rows match it's faster
+        # to score the whole matrix and select the matching scores
+        used = len(self.row_ids)
+        if len(rows) * 2 > used:
+            scores = (self.matrix[:used] @ queries.T)[rows]
+        else:
+            scores = self.matrix[rows] @ queries.T
+        scores *= self.inverse_norms[rows, None]
+        scores /= np.maximum(np.linalg.norm(queries, axis=1), 1e-12)
+
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+
+        results = []
+        for j in range(len(queries)):
+            top_rows = top[:, j][np.argsort(-scores[top[:, j], j])]
+            results.append([
+                (int(rows[i]), float(scores[i, j])) for i in top_rows
+            ])
+        return results
+
+    def list_ids(self, batch_size: int = 100):
+        with self.lock:
+            ids = list(self.rows)
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size]
+
+    def delete(self, ids):
+        with self.lock:
+            rows = [
+                (vector_id, row) for vector_id in ids
+                if (row := self.rows.get(vector_id)) is not None
+            ]
+            if not rows:
+                return
+
+            for vector_id, row in rows:
+                del self.rows[vector_id]
+                self.row_ids[row] = None
+                self.row_metadata[row] = None
+                self.free_rows.append(row)
+                self.live[row] = False
+                for column in self.columns.values():
+                    column.set(row, None)
+                if self.index is not None:
+                    self.index.mark_deleted(row)
+
+            self.version += 1
+            with self.connection:
+                self.set_state("version", self.version)
+                self.connection.executemany(
+                    "DELETE FROM vectors WHERE row = ?",
+                    [(row,) for _, row in rows]
+                )
+
+            if self.index is not None:
+                self.index_written()
+
+    def close(self):
+        with self.lock:
+            if self.index is not None and self.index_dirty:
+                self.save_index()
+
+    def drop(self):
+        with self.lock:
+            self.connection.close()
+            del self.matrix
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.load()
+
+
+def create_backend(name: str, directory: str, search: str) -> VectorBackend:
+    """Returns vector backend configured by name."""
+    if name == "pinecone":
+        return PineconeBackend()
+    elif name == "local":
+        return LocalBackend(directory, search=search)
+    else:
+        raise ValueError(
+            f"Unknown vector backend '{name}', must be one of: "
+            "'pinecone', 'local'")
+
+
+class LazyBackend:
+    """Descriptor creating a vector backend on first access.
+
+    Bound to VectorInterface as 'backend', so defining the interface
+    (or importing koi.vectorstore) doesn't connect to Pinecone or load
+    the local index until vectors are actually read or written.
+    """
+
+    def __init__(self, name: str, directory: str, search: str):
+        self.args = (name, directory, search)
+        self.backend: VectorBackend | None = None
+        self.lock = threading.Lock()
+
+    def __get__(self, instance, owner=None) -> VectorBackend:
+        if self.backend is None:
+            with self.lock:
+                if self.backend is None:
+                    self.backend = create_backend(*self.args)
+        return self.backend
@@ -1,41 +1,22 @@
 import voyageai
-from pinecone import Pinecone, ServerlessSpec
-
-from koi.config import (
-    PINECONE_API_KEY,
-    PINECONE_INDEX_NAME,
-    EMBEDDINGS_DIMENSION,
-    PINECONE_CLOUD_PROVIDER,
-    PINECONE_CLOUD_REGION,
-    PINECONE_INDEX_METRIC,
-    VOYAGEAI_API_KEY,
-    VOYAGEAI_MODEL
-)
-
-pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-
-# creates serverless index if it doesn't exist yet
-if PINECONE_INDEX_NAME not in pinecone_client.list_indexes().names():
-    pinecone_client.create_index(
-        name=PINECONE_INDEX_NAME,
-        dimension=EMBEDDINGS_DIMENSION,
-        spec=ServerlessSpec(
-            cloud=PINECONE_CLOUD_PROVIDER,
-            region=PINECONE_CLOUD_REGION
-        ),
-        metric=PINECONE_INDEX_METRIC
-    )
-
-pinecone_index = pinecone_client.Index(PINECONE_INDEX_NAME)
 
+from koi.config import VOYAGEAI_API_KEY, VOYAGEAI_MODEL
 
 voyageai_client = voyageai.Client(api_key=VOYAGEAI_API_KEY)
 
+# transient errors, embedding requests failing with these are retried
+VOYAGEAI_RETRY_ERRORS = (
+    voyageai.error.RateLimitError,
+    voyageai.error.ServiceUnavailableError,
+    voyageai.error.Timeout,
+    voyageai.error.APIConnectionError
+)
+
 # wrapper function to set constants and default params in one place
-def voyage_embed_texts(texts, input_type="document"):
+def voyage_embed_texts(texts, input_type="document", truncation=False):
     return voyageai_client.embed(
         texts=texts,
         model=VOYAGEAI_MODEL,
         input_type=input_type,
-        truncation=False
+        truncation=truncation
     ).embeddings
@@ -0,0 +1,83 @@
+from array import array
+
+from koi import utils
+from .sqlite_store import SQLiteStore
+
+
+class EmbeddingCache(SQLiteStore):
+    """Persistent cache of embeddings, keyed by model, input type, and text.
+
+    Texts are identified by their SHA-256 hash and embeddings are stored
+    as packed float32 arrays in a local SQLite database, so repeated
+    texts (reposted messages, shared boilerplate, unchanged pages, and
+    repeated queries) are only sent to the embedding provider once.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT NOT NULL,
+            input_type TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            PRIMARY KEY (model, input_type, hash)
+        );
+        """
+
+    # stays below SQLite's limit on parameters per query
+    MAX_PARAMETERS = 900
+
+    @staticmethod
+    def pack(embedding: list[float]) -> bytes:
+        return array("f", embedding).tobytes()
+
+    @staticmethod
+    def unpack(blob: bytes) -> list[float]:
+        return array("f", blob).tolist()
+
+    def get_many(
+            self,
+            model: str,
+            input_type: str,
+            texts: list[str]
+        ) -> list[list[float] | None]:
+        """Returns cached embeddings of texts, None where missing."""
+        hashes = [utils.hash_string(text) for text in texts]
+        unique_hashes = list(dict.fromkeys(hashes))
+
+        found = {}
+        with self.lock:
+            for start in range(0, len(unique_hashes), self.MAX_PARAMETERS):
+                chunk = unique_hashes[start:start + self.MAX_PARAMETERS]
+                rows = self.connection.execute(
+                    "SELECT hash, vector FROM embeddings "
+                    "WHERE model = ? AND input_type = ? AND hash IN "
+                    f"({', '.join('?' * len(chunk))})",
+                    (model, input_type, *chunk)
+                ).fetchall()
+                found.update(rows)
+
+        return [
+            self.unpack(found[h]) if h in found else None
+            for h in hashes
+        ]
+
+    def put_many(
+            self,
+            model: str,
+            input_type: str,
+            texts: list[str],
+            embeddings: list[list[float]]
+        ):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [
+                    (model, input_type, utils.hash_string(text),
+                        self.pack(embedding))
+                    for text, embedding in zip(texts, embeddings)
+                ]
+            )
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM embeddings")
@@ -0,0 +1,133 @@
+import json, time
+from dataclasses import dataclass
+
+from .sqlite_store import SQLiteStore
+
+
+@dataclass
+class QueuedVector:
+    """A vector waiting to be embedded, as stored in the EmbeddingQueue."""
+
+    id: str
+    text: str
+    metadata: dict
+    version: int
+    queued_at: float
+
+
+class EmbeddingQueue(SQLiteStore):
+    """Durable, thread safe queue of vectors waiting to be embedded.
+
+    Queued vectors are stored in a local SQLite database, so they
+    survive process restarts, and are deduplicated by vector id:
+    queueing an id which is already queued replaces its text and
+    metadata. All operations are serialized with a lock, so the queue
+    can be shared by concurrent request handlers.
+
+    Re-queueing an RID's vectors with 'replace' also removes its queued
+    vectors which aren't in the new set (e.g. chunks of a previously
+    longer text).
+
+    Each put assigns a new version to the vector. Flushing reads a
+    snapshot of the queue and removes only the versions it embedded, so
+    vectors re-queued while a flush is in progress aren't lost.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS queue (
+            id TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            queued_at REAL NOT NULL
+        );
+        """
+
+    def on_connect(self, connection):
+        self.version = connection.execute(
+            "SELECT COALESCE(MAX(version), 0) FROM queue"
+        ).fetchone()[0]
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def oldest(self) -> float | None:
+        """Returns the time the longest waiting vector was queued."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT MIN(queued_at) FROM queue").fetchone()[0]
+
+    def has(self, rid_str: str) -> bool:
+        """Returns True if any vectors of an RID are queued."""
+        prefix = rid_str + "#"
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM queue WHERE id = ? "
+                "OR substr(id, 1, ?) = ? LIMIT 1",
+                (rid_str, len(prefix), prefix)
+            ).fetchone() is not None
+
+    def put_many(self, vectors: list[tuple[str, str, dict]]):
+        """Queues (id, text, metadata) tuples, replacing queued ids."""
+        with self.lock, self.connection:
+            self._put(vectors)
+
+    def replace(self, rid_str: str, vectors: list[tuple[str, str, dict]]):
+        """Replaces all queued vectors of an RID, in one transaction."""
+        with self.lock, self.connection:
+            self._discard(rid_str)
+            self._put(vectors)
+
+    def _put(self, vectors):
+        queued_at = time.time()
+        rows = []
+        for vector_id, text, metadata in vectors:
+            self.version += 1
+            rows.append((
+                vector_id, text, json.dumps(metadata),
+                self.version, queued_at
+            ))
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO queue VALUES (?, ?, ?, ?, ?)", rows)
+
+    def peek(self, limit: int | None = None) -> list[QueuedVector]:
+        """Returns queued vectors in the order they were queued."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, text, metadata, version, queued_at FROM queue "
+                "ORDER BY version LIMIT ?",
+                (-1 if limit is None else limit,)
+            ).fetchall()
+
+        return [
+            QueuedVector(vector_id, text, json.loads(metadata), version, queued_at)
+            for vector_id, text, metadata, version, queued_at in rows
+        ]
+
+    def remove(self, vectors: list[QueuedVector]):
+        """Removes vectors, unless they were re-queued since being read."""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM queue WHERE id = ? AND version = ?",
+                [(vector.id, vector.version) for vector in vectors]
+            )
+
+    def discard(self, rid_str: str):
+        """Removes all queued vectors of an RID, including chunks."""
+        with self.lock, self.connection:
+            self._discard(rid_str)
+
+    def _discard(self, rid_str):
+        prefix = rid_str + "#"
+        self.connection.execute(
+            "DELETE FROM queue WHERE id = ? "
+            "OR substr(id, 1, ?) = ?",
+            (rid_str, len(prefix), prefix)
+        )
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM queue")
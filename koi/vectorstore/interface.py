@@ -1,16 +1,39 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import threading
+from dataclasses import replace
+
 from rid_lib.core import RID, DataObject
 
 from koi.config import (
-    PINECONE_BATCH_SIZE,
+    VECTOR_BACKEND,
+    VECTOR_DIRECTORY,
+    VECTOR_SEARCH,
+    VOYAGEAI_MODEL,
     VOYAGEAI_BATCH_SIZE,
+    VOYAGEAI_BATCH_TOKEN_LIMIT,
+    VOYAGEAI_MAX_INPUT_TOKENS,
+    VOYAGEAI_CONCURRENCY,
+    VOYAGEAI_REQUESTS_PER_MINUTE,
+    VOYAGEAI_TOKENS_PER_MINUTE,
+    VOYAGEAI_MAX_RETRIES,
     EMBEDDING_QUEUE_LIMIT,
-    CHUNK_SIZE,
-    CHUNK_OVERLAP
+    EMBEDDING_QUEUE_PATH,
+    EMBEDDING_QUEUE_MAX_AGE,
+    EMBEDDING_CACHE_PATH,
+    VECTOR_MANIFEST_PATH,
+    CHUNKING_STRATEGIES
 )
 from koi import utils
-from .connectors import pinecone_index, voyage_embed_texts
-from .object_model import VectorObject
+from koi.cache import CacheInterface
+from koi.processing import processing_pool
+from .backends import VectorBackend, LazyBackend
+from koi.chunker import Chunk, get_chunker, chunk_offsets
+from .connectors import voyage_embed_texts, VOYAGEAI_RETRY_ERRORS
+from .embedding_cache import EmbeddingCache
+from .embedding_queue import EmbeddingQueue
+from .manifest import ChunkManifest, ManifestEntry
+from .object_model import VectorObject, VectorMetadata
+from .scheduler import EmbeddingScheduler, RateLimiter, pack_batches
+from .worker import EmbeddingWorker
 
 
 class VectorInterface:
@@ -34,7 +57,29 @@ class VectorInterface:
     objects for better RAG performance.
     """
 
-    embedding_queue = []
+    backend: VectorBackend = LazyBackend(
+        VECTOR_BACKEND, VECTOR_DIRECTORY, VECTOR_SEARCH)
+    manifest = ChunkManifest(VECTOR_MANIFEST_PATH)
+    embedding_queue = EmbeddingQueue(EMBEDDING_QUEUE_PATH)
+    flush_lock = threading.Lock()
+    embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+    embedding_scheduler = EmbeddingScheduler(
+        voyage_embed_texts,
+        concurrency=VOYAGEAI_CONCURRENCY,
+        rate_limiter=RateLimiter(
+            VOYAGEAI_REQUESTS_PER_MINUTE,
+            VOYAGEAI_TOKENS_PER_MINUTE
+        ),
+        retry_on=VOYAGEAI_RETRY_ERRORS,
+        max_retries=VOYAGEAI_MAX_RETRIES,
+        max_item_tokens=VOYAGEAI_MAX_INPUT_TOKENS
+    )
+    worker = EmbeddingWorker(
+        embedding_queue,
+        flush=lambda: VectorInterface.embed_queue(),
+        size_limit=EMBEDDING_QUEUE_LIMIT,
+        max_age=EMBEDDING_QUEUE_MAX_AGE
+    )
 
     def __init__(self, rid: RID):
         self.rid = rid
@@ -44,22 +89,36 @@ class VectorInterface:
             data_object: DataObject | None = None,
             from_dereference: bool = False,
             from_cache: bool = False,
-            flush_queue=False
+            flush_queue=False,
+            skip_unchanged=True
         ) -> None:
         """Adds an RID object to the embedding queue.
 
         Currently reads JSON data from cache, and looks for a text field
-        to embed. Text is chunked if exceeding maximum chunk size, and
-        added to embedding queue in the following format:
+        to embed. Text is chunked with the strategy configured for the
+        RID's type (see chunking_strategy), and added to embedding queue
+        in the following format:
 
-            [rid_str, text, metadata]
+            (rid_str, text, metadata)
 
         For chunks, "#chunk:{id}" is appended to the end of the rid_str.
-        If the queue exceeds the queue_limit, or flush_queue is set to
-        true, embed_queue is called, embedding all of the queued chunks.
-
-        TODO: Figure out what happens when the same object gets embedded
-        multiple times, handle object deletion within queue
+        When the background worker is running (see worker.py), it is
+        notified and flushes the queue once it exceeds the queue limit,
+        its oldest vector exceeds the maximum age, or flush_queue is set
+        to true. Otherwise, embed_queue is called directly in those
+        cases, embedding all of the queued chunks.
+
+        If 'skip_unchanged' is True, and all of the object's vectors are
+        stored, embedded from data with the same hash, and none are
+        queued, nothing is queued (see is_unchanged). Otherwise all of its
+        vectors are queued again, replacing any queued vectors (e.g. of
+        data which has since been reverted), and stored vectors that
+        won't be replaced (e.g. from a previously longer text) are
+        deleted.
+
+        The queue is persistent (see embedding_queue.py), embedding the
+        same object multiple times before a flush replaces all of its
+        queued vectors, and deleting an object removes them.
         """
 
         if sum([
@@ -106,78 +165,272 @@ class VectorInterface:
             metadata = cache_object.metadata
 
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
+        stored = self.get_manifest_entries()
+        if skip_unchanged and self.is_unchanged(stored, metadata):
+            print(f"{self.rid} unchanged since last embedding, skipping")
+            return False
+
+        chunker = get_chunker(self.chunking_strategy())
+        self.queue_chunks(text, metadata, list(chunker.chunks(text)), stored)
+        self.notify_queue(flush_queue)
+        return True
+
+    @classmethod
+    def embed_many(
+            cls,
+            rids: list[RID],
+            flush_queue=False,
+            skip_unchanged=True
+        ) -> list[RID]:
+        """Adds cached RID objects to the embedding queue in bulk.
+
+        Equivalent to calling embed(from_cache=True) for each RID, but
+        texts are chunked in the processing pool (see koi/processing.py),
+        in parallel across processes. Returns the RIDs which were queued.
+        """
+        pending = []
+        for rid, cache_object in zip(rids, CacheInterface.read_many(rids)):
+            if not cache_object or not cache_object.json_data:
+                print(f"{rid} cache empty or doesn't contain JSON data")
+                continue
+            elif "text" not in cache_object.json_data:
+                print(f"{rid} cache data missing 'text' field")
+                continue
+
+            interface = rid.vector
+            stored = interface.get_manifest_entries()
+            if skip_unchanged and interface.is_unchanged(
+                    stored, cache_object.metadata):
+                print(f"{rid} unchanged since last embedding, skipping")
+                continue
+
+            pending.append((
+                interface,
+                cache_object.json_data["text"],
+                cache_object.metadata,
+                stored
+            ))
+
+        offsets = processing_pool.imap(chunk_offsets, (
+            (text, interface.chunking_strategy())
+            for interface, text, _, _ in pending
+        ))
+        for (interface, text, metadata, stored), spans in zip(pending, offsets):
+            chunks = [Chunk(text[start:end], start, end) for start, end in spans]
+            interface.queue_chunks(text, metadata, chunks, stored)
+
+        cls.notify_queue(flush_queue)
+        return [interface.rid for interface, _, _, _ in pending]
+
+    def chunking_strategy(self) -> str:
+        """Returns the chunking strategy of the RID's type (see chunker.py).
+
+        Strategies are configured by RID type or space in config.py, and
+        default to "characters".
+        """
+        return CHUNKING_STRATEGIES.get(
+            f"{self.rid.space}.{self.rid.format}",
+            CHUNKING_STRATEGIES.get(self.rid.space, "characters")
         )
 
-        chunks = []
-        for doc in text_splitter.create_documents([text]):
-            chunk_text = doc.page_content
-            start = text.find(chunk_text)
-            end = start + len(chunk_text)
-            chunks.append({
-                "text": chunk_text,
-                "start": start,
-                "end": end
-            })
+    def is_unchanged(self, stored: list[ManifestEntry], metadata: dict) -> bool:
+        """Returns True if the RID's vectors are all stored, from the same data.
 
+        Every stored vector must have been embedded from data with the
+        same hash, with the configured model, all of the chunks the text
+        was split into must be stored (a failed flush can leave some of
+        them queued), and none of the RID's vectors can be queued.
+        Chunks recorded before the manifest tracked 'num_chunks' are
+        treated as changed, and queued again once.
+        """
+        if not stored or any(
+            entry.sha256_hash != metadata["sha256_hash"] or
+            entry.model != VOYAGEAI_MODEL
+            for entry in stored
+        ):
+            return False
+
+        num_chunks = 1 if stored[0].chunk_id is None else stored[0].num_chunks
+        if len(stored) != num_chunks:
+            return False
+        return not self.embedding_queue.has(str(self.rid))
+
+    def queue_chunks(
+            self,
+            text: str,
+            metadata: dict,
+            chunks: list[Chunk],
+            stored: list[ManifestEntry]
+        ) -> None:
+        """Queues chunks of the RID's text, and deletes stale vectors.
+
+        Vectors are queued with compact metadata (see VectorMetadata),
+        built from the cache metadata of the object.
+        """
+        vector_metadata = VectorMetadata.from_dict(metadata)
         if len(chunks) == 1:
-            self.embedding_queue.append([
-                str(self.rid), text, metadata
+            vector_ids = [str(self.rid)]
+        else:
+            vector_ids = [
+                self.create_rid_fragment_string(self.rid, i)
+                for i in range(len(chunks))
+            ]
+        
+        stale_ids = {entry.vector_id for entry in stored} - set(vector_ids)
+        if stale_ids:
+            print(f"deleting {len(stale_ids)} stale vectors of {self.rid}")
+            self.backend.delete(list(stale_ids))
+            self.manifest.remove(list(stale_ids))
+
+        if len(chunks) == 1:
+            self.embedding_queue.replace(str(self.rid), [
+                (str(self.rid), text, vector_metadata.to_dict())
             ])
             print(f"added {self.rid} to embedding queue")
 
         else:
+            queued_chunks = []
             for i, chunk in enumerate(chunks):
                 rid_fragment = self.create_rid_fragment_string(self.rid, i)
-                chunk_text = chunk["text"]
-                chunk_meta = {
-                    **metadata,
-                    "character_length": len(chunk_text),
-                    "chunk_start": chunk["start"],
-                    "chunk_end": chunk["end"],
-                    "chunk_id": i,
-                    "num_chunks": len(chunks)
-                }
+                chunk_text = chunk.text
+                chunk_meta = replace(
+                    vector_metadata,
+                    character_length=len(chunk_text),
+                    chunk_start=chunk.start,
+                    chunk_end=chunk.end,
+                    chunk_id=i,
+                    num_chunks=len(chunks)
+                ).to_dict()
 
                 print(f"{self.rid} chunk {i+1}/{len(chunks)} "
-                    f"[{chunk['start']}:{chunk['end']}]")
+                    f"[{chunk.start}:{chunk.end}]")
                 
-                self.embedding_queue.append([
-                    rid_fragment, chunk_text, chunk_meta
-                ])
+                queued_chunks.append(
+                    (rid_fragment, chunk_text, chunk_meta)
+                )
+            self.embedding_queue.replace(str(self.rid), queued_chunks)
             print(f"added {self.rid} to embedding queue ({len(chunks)} chunks)")
 
-        if flush_queue is True or len(self.embedding_queue) > EMBEDDING_QUEUE_LIMIT:
-            self.embed_queue()
-
-        return True
+    @classmethod
+    def notify_queue(cls, flush_queue=False) -> None:
+        """Signals the worker, or flushes the queue if the worker isn't running."""
+        if cls.worker.running:
+            cls.worker.notify(flush=flush_queue)
+        elif flush_queue is True or len(cls.embedding_queue) > EMBEDDING_QUEUE_LIMIT:
+            cls.embed_queue()
 
     @classmethod
     def embed_queue(cls) -> None:
-        """Embeds all objects in the embedding queue."""
-        print(f"flushing {len(cls.embedding_queue)} objects from embedding queue")
+        """Embeds all objects in the embedding queue.
+
+        Embeddings of previously embedded texts are reused from the
+        embedding cache (see embedding_cache.py). The remaining texts are
+        packed into batches by estimated token count, up to the
+        provider's request limits, with texts too long to embed whole
+        sent (and truncated) on their own. Batches are embedded
+        concurrently (see scheduler.py), and each batch is upserted and
+        removed from the queue as soon as its embeddings are returned.
+        If a batch fails, finished batches are kept and the rest remain
+        queued.
+
+        Only one flush runs at a time. Vectors queued while a flush is in
+        progress are left in the queue for the next one.
+        """
+        with cls.flush_lock:
+            queued = cls.embedding_queue.peek()
+            if not queued:
+                return
+            
+            print(f"flushing {len(queued)} objects from embedding queue")
 
-        ids, texts, metas = list(zip(*cls.embedding_queue))
+            cached = cls.embedding_cache.get_many(
+                VOYAGEAI_MODEL, "document",
+                [vector.text for vector in queued]
+            )
+            cache_hits = [
+                (vector, embedding)
+                for vector, embedding in zip(queued, cached)
+                if embedding is not None
+            ]
+            if cache_hits:
+                cls.upsert_embedded(cache_hits)
+                print(f"reused cached embeddings for {len(cache_hits)} objects")
+
+            # vectors with identical texts share a single embedding
+            pending: dict[str, list] = {}
+            for vector, embedding in zip(queued, cached):
+                if embedding is None:
+                    pending.setdefault(vector.text, []).append(vector)
+            texts = list(pending)
+
+            batches = [
+                [texts[i] for i in batch]
+                for batch in pack_batches(
+                    texts,
+                    max_items=VOYAGEAI_BATCH_SIZE,
+                    token_limit=VOYAGEAI_BATCH_TOKEN_LIMIT,
+                    max_item_tokens=VOYAGEAI_MAX_INPUT_TOKENS
+                )
+            ]
+
+            num_embedded = 0
+            for i, embeddings in cls.embedding_scheduler.run(batches):
+                batch = batches[i]
+                cls.embedding_cache.put_many(
+                    VOYAGEAI_MODEL, "document", batch, embeddings)
+                
+                cls.upsert_embedded([
+                    (vector, embedding)
+                    for text, embedding in zip(batch, embeddings)
+                    for vector in pending[text]
+                ])
 
-        embeddings = []
-        while len(embeddings) < len(cls.embedding_queue):
-            start = len(embeddings)
-            end = min(start + VOYAGEAI_BATCH_SIZE, len(cls.embedding_queue))
-            embeddings.extend(voyage_embed_texts(texts[start:end]))
-            print(f"created embeddings for {end} objects")
+                num_embedded += len(batch)
+                print(f"created embeddings for {num_embedded} texts")
 
-        print(f"resulting in {len(embeddings)} embeddings")
-        
-        vectors = list(zip(
-            ids, embeddings, metas
-        ))
+    @classmethod
+    def upsert_embedded(cls, embedded: list[tuple]) -> None:
+        """Upserts (QueuedVector, embedding) pairs and dequeues them."""
+        cls.backend.upsert([
+            (vector.id, embedding, vector.metadata)
+            for vector, embedding in embedded
+        ])
+        cls.manifest.put_many(
+            [(vector.id, vector.metadata) for vector, _ in embedded],
+            model=VOYAGEAI_MODEL
+        )
+        cls.embedding_queue.remove([vector for vector, _ in embedded])
+
+    def get_manifest_entries(self) -> list[ManifestEntry]:
+        """Returns the manifest entries of vectors stored for RID object.
+
+        RIDs unknown to the manifest (embedded before it existed) are
+        looked up in the vector backend once, and recorded.
+        """
+        entries = self.manifest.get(str(self.rid))
+        if entries is not None:
+            return entries
+
+        rid_fragment_str = self.create_rid_fragment_string(self.rid, 0)
+        vectors = self.backend.fetch([str(self.rid), rid_fragment_str])
 
-        pinecone_index.upsert(
-            vectors=vectors, batch_size=PINECONE_BATCH_SIZE
+        if rid_fragment_str in vectors and str(self.rid) not in vectors:
+            num_chunks = int(vectors[rid_fragment_str]["metadata"]["num_chunks"])
+            vectors = self.backend.fetch([
+                self.create_rid_fragment_string(self.rid, chunk_id)
+                for chunk_id in range(num_chunks)
+            ])
+
+        # metadata doesn't record the model, assumes the configured one
+        self.manifest.track(
+            str(self.rid),
+            [
+                (vector_id, vector["metadata"])
+                for vector_id, vector in vectors.items()
+            ],
+            model=VOYAGEAI_MODEL
         )
-        cls.embedding_queue = []
+        return self.manifest.get(str(self.rid))
 
     def get_vector_ids(
             self,
@@ -185,36 +438,20 @@ class VectorInterface:
         ) -> list[str] | tuple[list[str], dict]:
         """Returns a list of all vector ids associated with RID object.
 
-        If 'return_vectors' is set to True, a list of the raw vector
-        dicts returned by the pinecone API will also be returned.
+        Vector ids are read from the local chunk manifest (see
+        manifest.py). If 'return_vectors' is set to True, a dict of the
+        raw vector dicts returned by the vector backend will also be
+        returned, fetched in a single request.
 
         If an RID object is not chunked, it will have a single vector
         with an id equal to the RID. If the RID object is chunked, it
         will have multiple vectors with ids in the form of 
         '{RID}#chunk:{id}'.
         """
+        vector_ids = [entry.vector_id for entry in self.get_manifest_entries()]
 
-        rid_fragment_str = self.create_rid_fragment_string(self.rid, 0)
-        potential_ids = [
-            str(self.rid),
-            rid_fragment_str
-        ]
-
-        result = pinecone_index.fetch(potential_ids)
-        vectors = result["vectors"]
-
-        vector_ids = []
-
-        if str(self.rid) in vectors:
-            vector_ids.append(str(self.rid))
-        elif rid_fragment_str in vectors:
-            num_chunks = int(vectors[rid_fragment_str]["metadata"]["num_chunks"])
-            for chunk_id in range(num_chunks):
-                vector_ids.append(
-                    self.create_rid_fragment_string(self.rid, chunk_id)
-                )
-        
         if return_vectors:
+            vectors = self.backend.fetch(vector_ids) if vector_ids else {}
             return vector_ids, vectors
         else:
             return vector_ids
@@ -223,31 +460,20 @@ class VectorInterface:
         """Returns a list of all VectorObjects associated with RID object."""
         vector_ids, vectors = self.get_vector_ids(return_vectors=True)
 
-        if len(vector_ids) == 1:
-            vector_id = vector_ids[0]
-            return [
-                VectorObject(vectors[vector_id])
-            ]
-        
-        elif len(vector_ids) > 1:
-            result = pinecone_index.fetch(vector_ids)
-            chunk_vectors = result["vectors"]
-
-            return [
-                VectorObject(chunk_vectors[vector_id])
-                for vector_id in vector_ids
-            ]
-
-        else:
-            return []
+        return [
+            VectorObject(vectors[vector_id])
+            for vector_id in vector_ids
+            if vector_id in vectors
+        ]
         
-    def delete(self) -> dict:
+    def delete(self) -> None:
         """Deletes all vectors associated with RID object."""
+        self.embedding_queue.discard(str(self.rid))
+
         vector_ids = self.get_vector_ids()
         if vector_ids:
-            return pinecone_index.delete(self.get_vector_ids())
-        else:
-            return {}
+            self.backend.delete(vector_ids)
+        self.manifest.discard(str(self.rid))
 
     @staticmethod
     def create_rid_fragment_string(rid, chunk_id) -> str:
@@ -258,8 +484,38 @@ class VectorInterface:
         """
         return f"{rid}#chunk:{chunk_id}"
     
-    @staticmethod
+    @classmethod
+    def embed_queries(cls, texts: list[str]) -> list[list[float]]:
+        """Returns embeddings of queries, cached by their text.
+
+        Queries missing from the embedding cache are embedded together
+        in a single request.
+        """
+        embeddings = cls.embedding_cache.get_many(
+            VOYAGEAI_MODEL, "query", texts)
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings)
+            if embedding is None
+        ))
+        if missing:
+            new_embeddings = voyage_embed_texts(missing, input_type="query")
+            cls.embedding_cache.put_many(
+                VOYAGEAI_MODEL, "query", missing, new_embeddings)
+            embedded = dict(zip(missing, new_embeddings))
+            embeddings = [
+                embedded[text] if embedding is None else embedding
+                for text, embedding in zip(texts, embeddings)
+            ]
+        return embeddings
+
+    @classmethod
+    def embed_query(cls, text: str) -> list[float]:
+        """Returns the embedding of a query, cached by its text."""
+        return cls.embed_queries([text])[0]
+
+    @classmethod
     def query(
+        cls,
         text,
         top_k=15,
         filter={
@@ -269,19 +525,90 @@ class VectorInterface:
         }
     ) -> list[VectorObject]:
         """Returns a list of VectorObjects resulting from provided query."""
-        result = pinecone_index.query(
-            vector=voyage_embed_texts([text], input_type="query"),
-            filter=filter,
+        vectors = cls.backend.query(
+            cls.embed_query(text),
             top_k=top_k,
-            include_metadata=True
+            filter=filter
         )
-        vectors = result["matches"]
 
         return [
             VectorObject(v) for v in vectors
         ]
+
+    @classmethod
+    def query_many(
+        cls,
+        texts: list[str],
+        top_k=15,
+        filter={
+            "character_length": {
+                "$gt": 200
+            }
+        }
+    ) -> list[VectorObject]:
+        """Returns VectorObjects matching any of the provided queries.
+
+        All queries are embedded in one request and searched at once
+        (concurrently, or as a single batch for the local backend). Up
+        to 'top_k' results of each query are merged, vectors matched by
+        multiple queries are kept once with their highest score, and
+        the results are ordered by score.
+        """
+        if not texts:
+            return []
+
+        results = cls.backend.query_many(
+            cls.embed_queries(texts),
+            top_k=top_k,
+            filter=filter
+        )
+
+        best = {}
+        for vectors in results:
+            for v in vectors:
+                if v["id"] not in best or v["score"] > best[v["id"]]["score"]:
+                    best[v["id"]] = v
+
+        return [
+            VectorObject(v) for v in
+            sorted(best.values(), key=lambda v: v["score"], reverse=True)
+        ]
     
-    @staticmethod
-    def drop() -> None:
+    @classmethod
+    def migrate_metadata(cls) -> None:
+        """Compacts the metadata of vectors embedded with full metadata.
+
+        Vectors used to store a copy of their object's cache metadata,
+        they are rewritten with only the VectorMetadata fields. Stored
+        vectors are fetched and upserted again with their values, since
+        Pinecone can only add metadata fields in place, not remove them.
+        Queued vectors are compacted as well, and vectors which already
+        have compact metadata are skipped.
+        """
+        cls.embedding_queue.put_many([
+            (vector.id, vector.text, metadata)
+            for vector in cls.embedding_queue.peek()
+            if (metadata := VectorMetadata.from_dict(vector.metadata).to_dict())
+                != vector.metadata
+        ])
+
+        num_checked = num_migrated = 0
+        for ids in cls.backend.list_ids():
+            migrated = []
+            for vector_id, vector in cls.backend.fetch(ids).items():
+                metadata = VectorMetadata.from_dict(vector["metadata"]).to_dict()
+                if metadata != vector["metadata"]:
+                    migrated.append((vector_id, vector["values"], metadata))
+
+            if migrated:
+                cls.backend.upsert(migrated)
+            num_checked += len(ids)
+            num_migrated += len(migrated)
+            print(f"migrated {num_migrated}/{num_checked} vectors")
+
+    @classmethod
+    def drop(cls) -> None:
         """Deletes all vectors."""
-        pinecone_index.delete(delete_all=True)
+        cls.embedding_queue.clear()
+        cls.backend.drop()
+        cls.manifest.clear()
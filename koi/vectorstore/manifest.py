@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+
+from .sqlite_store import SQLiteStore
+
+
+@dataclass
+class ManifestEntry:
+    """A stored vector of an RID, as recorded in the ChunkManifest."""
+
+    vector_id: str
+    rid: str
+    chunk_id: int | None
+    chunk_start: int | None
+    chunk_end: int | None
+    sha256_hash: str | None
+    model: str | None
+    num_chunks: int | None
+
+
+class ChunkManifest(SQLiteStore):
+    """Local record of the vectors stored for each RID.
+
+    Maps RIDs to their vector ids, chunk offsets, and the hash of the
+    data and model they were embedded from. It is updated whenever
+    vectors are upserted or deleted, so vector ids can be resolved
+    without querying the vector backend.
+
+    RIDs embedded before the manifest existed are unknown to it, get
+    returns None for them and the caller looks them up in the vector
+    backend once, recording the result with 'track'. RIDs known to have
+    no vectors are recorded as well.
+
+    Chunks record the number of chunks their text was split into, so a
+    partially stored RID (e.g. after a failed flush) can be detected.
+    Manifests created before it was recorded get the column added on
+    connect, with NULL for existing entries.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rids (
+            rid TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS vectors (
+            vector_id TEXT PRIMARY KEY,
+            rid TEXT NOT NULL,
+            chunk_id INTEGER,
+            chunk_start INTEGER,
+            chunk_end INTEGER,
+            sha256_hash TEXT,
+            model TEXT,
+            num_chunks INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS vectors_rid ON vectors (rid);
+        """
+
+    def on_connect(self, connection):
+        columns = {
+            row[1] for row in connection.execute("PRAGMA table_info(vectors)")
+        }
+        if "num_chunks" not in columns:
+            connection.execute(
+                "ALTER TABLE vectors ADD COLUMN num_chunks INTEGER")
+
+    def get(self, rid_str: str) -> list[ManifestEntry] | None:
+        """Returns RID's vectors in chunk order, or None if unknown."""
+        with self.lock:
+            known = self.connection.execute(
+                "SELECT 1 FROM rids WHERE rid = ?", (rid_str,)).fetchone()
+            if not known:
+                return None
+
+            rows = self.connection.execute(
+                "SELECT * FROM vectors WHERE rid = ? ORDER BY chunk_id",
+                (rid_str,)
+            ).fetchall()
+        return [ManifestEntry(*row) for row in rows]
+
+    def put_many(self, vectors: list[tuple[str, dict]], model: str | None):
+        """Records upserted (vector id, metadata) pairs."""
+        rows = [
+            (
+                vector_id,
+                metadata["rid"],
+                metadata.get("chunk_id"),
+                metadata.get("chunk_start"),
+                metadata.get("chunk_end"),
+                metadata.get("sha256_hash"),
+                model,
+                metadata.get("num_chunks")
+            )
+            for vector_id, metadata in vectors
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO rids VALUES (?)",
+                {(row[1],) for row in rows}
+            )
+
+    def track(
+            self,
+            rid_str: str,
+            vectors: list[tuple[str, dict]],
+            model: str | None
+        ):
+        """Records the vectors found for a previously unknown RID."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO rids VALUES (?)", (rid_str,))
+        self.put_many(vectors, model)
+
+    def remove(self, vector_ids: list[str]):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM vectors WHERE vector_id = ?",
+                [(vector_id,) for vector_id in vector_ids]
+            )
+
+    def discard(self, rid_str: str):
+        """Records that an RID no longer has any vectors."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM vectors WHERE rid = ?", (rid_str,))
+            self.connection.execute(
+                "INSERT OR IGNORE INTO rids VALUES (?)", (rid_str,))
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM vectors")
+            self.connection.execute("DELETE FROM rids")
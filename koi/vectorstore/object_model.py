@@ -1,9 +1,52 @@
 import json
+from dataclasses import dataclass, asdict, fields
 
 from rid_lib.core import RID
 from koi.config import CHUNK_SIZE
 
 
+@dataclass
+class VectorMetadata:
+    """Metadata stored with each vector in the vector backend.
+
+    Only fields needed to filter and locate vectors are stored, the
+    rest of an object's metadata (timestamp, files, etc.) is resolved
+    from the cache. 'sha256_hash' is the hash of the cached data the
+    vector was embedded from, and 'character_length' the length of the
+    embedded text.
+    """
+
+    rid: str
+    sha256_hash: str | None = None
+    character_length: int | None = None
+    chunk_id: int | None = None
+    chunk_start: int | None = None
+    chunk_end: int | None = None
+    num_chunks: int | None = None
+
+    @classmethod
+    def from_dict(cls, metadata: dict) -> "VectorMetadata":
+        """Reads the schema's fields from (vector or cache) metadata.
+
+        Other fields are dropped. Numbers are converted back to ints,
+        since Pinecone returns all of them as floats.
+        """
+        values = {}
+        for field in fields(cls):
+            value = metadata.get(field.name)
+            if value is not None and field.name not in ("rid", "sha256_hash"):
+                value = int(value)
+            values[field.name] = value
+        return cls(**values)
+
+    def to_dict(self) -> dict:
+        # unset fields are left out, Pinecone doesn't accept null values
+        return {
+            key: value for key, value in asdict(self).items()
+            if value is not None
+        }
+
+
 class VectorObject:
     def __init__(
             self,
@@ -46,7 +89,7 @@ class VectorObject:
             "id": self.id, 
             "rid": str(self.rid),
             "score": self.score or None,
-            "metadata": self.metadata,
+            "metadata": self.get_metadata(),
             "text": self.get_text(),
             "is_chunk": self.is_chunk,
         }
@@ -59,6 +102,15 @@ class VectorObject:
             })
         return json_data
 
+    def get_metadata(self):
+        """Returns vector metadata, extended with the RID's cache metadata.
+
+        Vectors only store a few fields (see VectorMetadata), the rest
+        are read from the cache entry.
+        """
+        cached_obj = self.rid.cache.read()
+        return {**(cached_obj.metadata or {}), **self.metadata}
+
     def get_text(self):
         """Returns associated text data from the cache.
 
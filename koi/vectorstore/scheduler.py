@@ -0,0 +1,167 @@
+import random, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, ~4 characters per token."""
+    return len(text) // 4 + 1
+
+def pack_batches(
+        texts: list[str],
+        max_items: int,
+        token_limit: int,
+        max_item_tokens: int
+    ) -> list[list[int]]:
+    """Groups texts into batches of indices within a request's limits.
+
+    Texts are packed in order, a batch is closed when adding the next
+    text would exceed 'max_items' or 'token_limit' estimated tokens.
+    Texts estimated above 'max_item_tokens' would fail the request they
+    are in, so each is placed in a batch of its own.
+    """
+    batches = []
+    batch, batch_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if tokens > max_item_tokens:
+            batches.append([i])
+            continue
+
+        if batch and (
+            len(batch) >= max_items or
+            batch_tokens + tokens > token_limit
+        ):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+
+        batch.append(i)
+        batch_tokens += tokens
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class RateLimiter:
+    """Sliding window budget of requests and tokens per minute.
+
+    Shared by all threads issuing embedding requests, acquire blocks
+    until a request of the given size fits within both budgets. A
+    request larger than the whole token budget is let through on its
+    own, so it fails at the provider instead of waiting forever.
+    """
+
+    def __init__(
+            self,
+            requests_per_minute: int,
+            tokens_per_minute: int,
+            window: float = 60.0
+        ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self.requests: deque[tuple[float, int]] = deque()
+        self.tokens = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.requests and self.requests[0][0] <= now - self.window:
+                    _, expired_tokens = self.requests.popleft()
+                    self.tokens -= expired_tokens
+
+                if not self.requests or (
+                    len(self.requests) < self.requests_per_minute and
+                    self.tokens + tokens <= self.tokens_per_minute
+                ):
+                    self.requests.append((now, tokens))
+                    self.tokens += tokens
+                    return
+
+                wait = self.requests[0][0] + self.window - now
+
+            time.sleep(max(wait, 0.01))
+
+
+class EmbeddingScheduler:
+    """Runs batches of embedding requests concurrently.
+
+    At most 'concurrency' requests are in flight at a time, and each one
+    waits for room in the rate limiter before being sent. Requests that
+    fail with one of the 'retry_on' exceptions (e.g. rate limit errors)
+    are retried with exponential backoff and jitter, up to 'max_retries'
+    times. A batch consisting of a single text estimated above
+    'max_item_tokens' is embedded with truncation enabled, instead of
+    being rejected by the provider.
+
+    Example:
+        scheduler = EmbeddingScheduler(voyage_embed_texts, concurrency=4)
+        for i, embeddings in scheduler.run(batches):
+            upsert(batches[i], embeddings)
+
+    Results are yielded as soon as each batch finishes, in completion
+    order, so the caller can store them while other batches are still
+    being embedded.
+    """
+
+    def __init__(
+            self,
+            embed: Callable[..., list[list[float]]],
+            concurrency: int,
+            rate_limiter: RateLimiter | None = None,
+            retry_on: tuple[type[Exception], ...] = (),
+            max_retries: int = 5,
+            backoff: float = 1.0,
+            max_item_tokens: int | None = None
+        ):
+        self.embed = embed
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter
+        self.retry_on = retry_on
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_item_tokens = max_item_tokens
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        truncation = (
+            self.max_item_tokens is not None and
+            len(texts) == 1 and tokens > self.max_item_tokens
+        )
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(tokens)
+            try:
+                return self.embed(texts, truncation=truncation)
+            except self.retry_on as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                delay += random.uniform(0, delay)
+                print(f"embedding request failed ({e!r}), "
+                    f"retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def run(
+            self,
+            batches: list[list[str]]
+        ) -> Iterator[tuple[int, list[list[float]]]]:
+        """Yields (batch index, embeddings) as each batch completes.
+
+        If a batch fails, batches which haven't started are cancelled
+        and the exception is raised.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = {
+                executor.submit(self.embed_batch, batch): i
+                for i, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
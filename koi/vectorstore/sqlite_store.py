@@ -0,0 +1,36 @@
+import sqlite3, threading
+
+
+class SQLiteStore:
+    """Base of the local SQLite stores used by VectorInterface.
+
+    The database is opened (and created, with SCHEMA) on first use
+    rather than when the store is constructed, so importing koi doesn't
+    create database files in the working directory. The connection is
+    shared by all threads, subclasses serialize access with 'lock'.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._connect_lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._connect_lock:
+                if self._connection is None:
+                    connection = sqlite3.connect(
+                        self.path, check_same_thread=False)
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.executescript(self.SCHEMA)
+                    self.on_connect(connection)
+                    self._connection = connection
+        return self._connection
+
+    def on_connect(self, connection: sqlite3.Connection):
+        """Called once the database is opened, before it is used."""
+        pass
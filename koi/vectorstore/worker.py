@@ -0,0 +1,94 @@
+import threading, time
+from typing import Callable
+
+from .embedding_queue import EmbeddingQueue
+
+
+class EmbeddingWorker:
+    """Background thread flushing the embedding queue.
+
+    The queue is flushed when it holds more than 'size_limit' vectors,
+    when its oldest vector has waited longer than 'max_age' seconds, or
+    when a flush is explicitly requested. Callers only enqueue vectors
+    and notify the worker, so they never wait on embedding requests.
+
+    Example:
+        worker = EmbeddingWorker(queue, flush, size_limit=128, max_age=30)
+        worker.start()
+        queue.put_many([(vector_id, text, metadata)])
+        worker.notify()
+        worker.stop()
+
+    Failed flushes are logged and retried on the next check, the queue
+    is persistent so nothing is lost if the process exits in between.
+    """
+
+    def __init__(
+            self,
+            queue: EmbeddingQueue,
+            flush: Callable[[], None],
+            size_limit: int,
+            max_age: float,
+            poll_interval: float = 1.0
+        ):
+        self.queue = queue
+        self.flush = flush
+        self.size_limit = size_limit
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.flush_requested = False
+        self.thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(
+            target=self.run, name="embedding-worker", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Stops the worker, waiting for an in progress flush to end."""
+        if not self.running:
+            return
+        self.stopping.set()
+        self.wake.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def notify(self, flush: bool = False):
+        """Signals that vectors were queued, or that a flush is wanted."""
+        if flush:
+            self.flush_requested = True
+        self.wake.set()
+
+    def should_flush(self) -> bool:
+        if self.flush_requested:
+            return True
+        if len(self.queue) > self.size_limit:
+            return True
+        oldest = self.queue.oldest()
+        return oldest is not None and time.time() - oldest >= self.max_age
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            if self.stopping.is_set():
+                break
+
+            try:
+                if self.should_flush():
+                    self.flush_requested = False
+                    self.flush()
+            except Exception as e:
+                print(f"embedding worker failed to flush queue: {e!r}")
+                # avoid retrying in a tight loop while a service is down
+                self.stopping.wait(self.poll_interval)
@@ -0,0 +1,3 @@
+from koi.cache import CacheInterface
+
+CacheInterface.migrate()
\ No newline at end of file
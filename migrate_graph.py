@@ -0,0 +1,3 @@
+from koi.graph import schema
+
+schema.migrate()
@@ -0,0 +1,3 @@
+from koi.vectorstore import VectorInterface
+
+VectorInterface.migrate_metadata()
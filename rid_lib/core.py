@@ -1,9 +1,14 @@
 from abc import ABCMeta, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 
 from .exceptions import *
 
 
+# maximum number of parsed RID strings interned by RID.from_string
+RID_CACHE_SIZE = 2 ** 16
+
+
 class PostInitCaller(ABCMeta):
     """RID metaclass adding support for a post init function."""
     def __call__(cls, *args, **kwargs):
@@ -62,22 +67,32 @@ class RID(metaclass=PostInitCaller):
         def from_reference(cls, reference) -> RIDType: ...
         def dereference(self) -> DataObject: ...
 
+    RID objects are immutable value objects, their canonical string is
+    built once when the reference is set, and hashed once after
+    construction. Types should declare
+    __slots__ for any attributes set in their __init__ function to keep
+    instances compact.
+
     In addition to the basic magic methods defined (__str__, __repr__,
     __eq__, __hash__), the following properties are defined:
 
         means: str
         params: dict
 
-    Finally, the RID class is called directly in two cases, accessing
+    Finally, the RID class is called directly in three cases, accessing
     the following static methods:
 
         def from_string(rid_str: str) -> RIDType: ...
+        def from_strings(rid_strs: list[str]) -> list[RIDType]: ...
         def _add_type(Type: RIDType) -> None: ...
 
     RID.from_string is a global RID validator and constructor, which
     accepts any RID string and returns an instance of the corresponding
     RID type if that type has a definition. If the string is improperly
     formatted, or the type is unknown, an exception will be raised.
+    Parsed RIDs are interned in a bounded LRU table keyed by the raw
+    string, so repeated strings return the same shared instance. 
+    RID.from_strings is the batch equivalent for lists of strings.
 
     In order to bind new types to be handled by RID.from_string, the 
     RID._add_type method should be called, passing in the RID type class.
@@ -122,6 +137,7 @@ class RID(metaclass=PostInitCaller):
 
         class SimpleTextSpace(RID):
             space = "substack"
+            __slots__ = ()
 
     Next we can define our post type:
 
@@ -132,6 +148,7 @@ class RID(metaclass=PostInitCaller):
 
         class SimpleTextPost(SimpleTextSpace):
             format = "post"
+            __slots__ = ("post_id",)
 
             def __init__(self, post_id: str):
                 self.post_id = post_id
@@ -187,46 +204,94 @@ class RID(metaclass=PostInitCaller):
     format: str
     reference: str
 
+    # '_interfaces' is reserved for extensions binding objects to RIDs
+    __slots__ = ("_str", "_interfaces")
+
     table = {}
 
     means_delimiter = "."
     rid_delimiter = ":"
 
     def __post_init__(self):
-        print("called post init")
-        pass
+        """Computes the hash of the canonical string, and freezes the RID."""
+        # str objects cache their own hash, so it is only computed once
+        hash(self._str)
+        # setting the interface slot marks the object as immutable
+        self._interfaces = None
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_interfaces"):
+            raise AttributeError(
+                f"{self.__class__.__name__} object is immutable, cannot "
+                f"set attribute '{name}'")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            f"{self.__class__.__name__} object is immutable, cannot "
+            f"delete attribute '{name}'")
     
+    def __reduce__(self):
+        return (RID.from_string, (self._str,))
+
     def __str__(self):
-        return self.means + RID.rid_delimiter + self.reference
+        return self._str
     
     def __repr__(self):
-        return f"<RID {self.__class__.__name__} object '{str(self)}'>"
+        return f"<RID {self.__class__.__name__} object '{self._str}'>"
     
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return str(self) == str(other)
+            return self._str == other._str
         else:
             return False
         
     def __hash__(self):
-        return hash(str(self))
+        return hash(self._str)
         
     @staticmethod
     def _add_type(Type):
-        RID.table[(Type.space, Type.format)] = Type
+        RID.table[Type.space + RID.means_delimiter + Type.format] = Type
+        RID._parse.cache_clear()
 
     @staticmethod
     def from_string(rid_str: str):
         if type(rid_str) is not str:
             raise InvalidRidFormatError("RID must inputted as a string")
-            
-        rid_components = rid_str.split(RID.rid_delimiter, 1)
-        if len(rid_components) != 2:
+
+        return RID._parse(rid_str)
+
+    @staticmethod
+    def from_strings(rid_strs: list[str]) -> list:
+        """Returns a list of RID objects from a list of RID strings.
+        
+        Repeated strings within the batch are only looked up once, and
+        resolve to the same RID instance.
+        """
+        parsed = {}
+        rids = []
+        for rid_str in rid_strs:
+            rid = parsed.get(rid_str)
+            if rid is None:
+                rid = parsed[rid_str] = RID.from_string(rid_str)
+            rids.append(rid)
+        return rids
+
+    @staticmethod
+    @lru_cache(maxsize=RID_CACHE_SIZE)
+    def _parse(rid_str: str):
+        """Parses an RID string, memoized by the raw string.
+
+        Successfully parsed RIDs are interned, repeated calls with the
+        same string return the same shared instance. Errors are not
+        cached. The table is cleared whenever a new type is added.
+        """
+        symbol, delimiter, reference = rid_str.partition(RID.rid_delimiter)
+        if not delimiter:
             raise InvalidRidFormatError(
                 f"Error processing string '{rid_str}': missing RID delimiter"
                 f"'{RID.rid_delimiter}'")
 
-        symbol, reference = rid_components
         if not symbol:
             raise InvalidRidFormatError(
                 f"Error processing string '{rid_str}': means is empty string")
@@ -234,24 +299,22 @@ class RID(metaclass=PostInitCaller):
             raise InvalidRidFormatError(
                 f"Error processing string '{rid_str}': reference is empty string")
 
-        means_components = symbol.split(RID.means_delimiter)
-        if len(means_components) != 2:
-            raise InvalidRidFormatError(
-                f"Error processing string '{rid_str}': the means component"
-                f"'{symbol}' should contain exactly one means delimiter" 
-                f"'{RID.means_delimiter}'")
-        
-        space, format = means_components
-        if not space:
-            raise InvalidRidFormatError(
-                f"Error processing string '{rid_str}': space is empty string")
-        if not format:
-            raise InvalidRidFormatError(
-                f"Error processing string '{rid_str}': format is empty string")
-
-        Type = RID.table.get((space, format))
+        Type = RID.table.get(symbol)
 
         if Type is None:
+            space, delimiter, format = symbol.partition(RID.means_delimiter)
+            if not delimiter or RID.means_delimiter in format:
+                raise InvalidRidFormatError(
+                    f"Error processing string '{rid_str}': the means component"
+                    f"'{symbol}' should contain exactly one means delimiter" 
+                    f"'{RID.means_delimiter}'")
+            if not space:
+                raise InvalidRidFormatError(
+                    f"Error processing string '{rid_str}': space is empty string")
+            if not format:
+                raise InvalidRidFormatError(
+                    f"Error processing string '{rid_str}': format is empty string")
+
             raise UndefinedMeansError(
                 f"Error processing string '{rid_str}': the means '{symbol}'"
                 "does not have a class definition"
@@ -267,6 +330,15 @@ class RID(metaclass=PostInitCaller):
 
         return rid
     
+    @property
+    def reference(self):
+        # stored as part of the canonical string rather than separately
+        return self._str[len(self.space) + len(self.format) + 2:]
+    
+    @reference.setter
+    def reference(self, reference):
+        self._str = self.means + RID.rid_delimiter + reference
+
     @property
     def means(self):
         return self.space + RID.means_delimiter + self.format
@@ -307,6 +379,12 @@ class DataObject:
     json_data: dict | None = None
     files: dict[str, bytes | str] | None = None
 
+    # hashes of the data, memoized by consumers that compute them
+    sha256_hash: str | None = field(
+        default=None, init=False, repr=False, compare=False)
+    files_sha256_hash: str | None = field(
+        default=None, init=False, repr=False, compare=False)
+
     def __bool__(self) -> bool:
         return bool(self.json_data) or bool(self.files)
     
@@ -5,6 +5,7 @@ from rid_lib.config import DISCORD_BOT_TOKEN
 
 class DiscordSpace(RID):
     space = "discord"
+    __slots__ = ()
     
     base_url = "https://discord.com/api/v10"
     
@@ -4,6 +4,7 @@ from .base import DiscordSpace
 
 class DiscordChannel(DiscordSpace):
     format = "channel"
+    __slots__ = ("channel_id",)
     
     def __init__(self, channel_id):
         self.channel_id = channel_id
@@ -4,6 +4,7 @@ from .base import DiscordSpace
 
 class DiscordGuild(DiscordSpace):
     format = "guild"
+    __slots__ = ("guild_id",)
     
     def __init__(self, guild_id):
         self.guild_id = guild_id
@@ -7,6 +7,7 @@ from .base import DiscordSpace
 
 class DiscordMessage(DiscordSpace):
     format = "message"
+    __slots__ = ("channel_id", "message_id")
     
     # https://discord.com/channels/845050172501262337/928767946040414289/1199916108082327562
     # https://discord.com/channels/845050172501262337/1199916108082327562/1278811819632492544
@@ -4,6 +4,7 @@ from .base import DiscordSpace
 
 class DiscordUser(DiscordSpace):
     format = "user"
+    __slots__ = ("user_id",)
     
     def __init__(self, user_id):
         self.user_id = user_id
@@ -1,4 +1,5 @@
 from rid_lib.core import RID
 
 class KoiSpace(RID):
-    space = "koi"
\ No newline at end of file
+    space = "koi"
+    __slots__ = ()
\ No newline at end of file
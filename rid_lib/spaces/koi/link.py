@@ -6,6 +6,7 @@ from .base import KoiSpace
 
 class KoiLink(KoiSpace):
     format = "link"
+    __slots__ = ("source", "target", "tag")
 
     def __init__(
         self, 
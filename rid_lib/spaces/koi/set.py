@@ -3,6 +3,7 @@ from .base import KoiSpace
 
 class KoiSet(KoiSpace):
     format = "set"
+    __slots__ = ()
 
     def __init__(self, reference):
         self.reference = reference
@@ -9,6 +9,7 @@ from rid_lib.config import (
 
 class SlackSpace(RID):
     space = "slack"
+    __slots__ = ()
     _app = None
 
     _domain_workspace_table = {
@@ -7,6 +7,7 @@ from .base import SlackSpace
 
 class SlackChannel(SlackSpace):
     format = "channel"
+    __slots__ = ("workspace_id", "channel_id")
 
     @property
     def url(self):
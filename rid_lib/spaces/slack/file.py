@@ -7,6 +7,7 @@ class SlackFile(SlackSpace):
     # <workspace_id>/<file_id>/<file_name>
 
     format = "file"
+    __slots__ = ("workspace_id", "file_id")
 
     @property
     def url(self):
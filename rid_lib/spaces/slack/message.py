@@ -11,6 +11,9 @@ class SlackMessage(SlackSpace):
     # <workspace_id>/<channel_id>/<message_id>/<thread_id>
 
     format = "message"
+    __slots__ = (
+        "workspace_id", "channel_id", "message_id", "thread_id", "is_in_thread"
+    )
 
     @property
     def url(self):
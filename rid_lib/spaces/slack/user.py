@@ -7,6 +7,7 @@ from .base import SlackSpace
 
 class SlackUser(SlackSpace):
     format = "user"
+    __slots__ = ("workspace_id", "user_id")
 
     @property
     def url(self):
@@ -3,6 +3,7 @@ from .base import SlackSpace
 
 class SlackWorkspace(SlackSpace):
     format = "workspace"
+    __slots__ = ("workspace_id",)
 
     def __init__(self, workspace_id: str):
         self.workspace_id = workspace_id
@@ -3,5 +3,6 @@ from rid_lib.core import RID
 
 class SubstackSpace(RID):
     space = "substack"
+    __slots__ = ()
     
     
\ No newline at end of file
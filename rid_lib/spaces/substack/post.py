@@ -1,6 +1,6 @@
 import requests
-from html2text import html2text
 
+from rid_lib import utils
 from rid_lib.core import RID, DataObject
 from rid_lib.exceptions import InvalidReferenceFormatError
 from .base import SubstackSpace
@@ -8,6 +8,7 @@ from .base import SubstackSpace
 
 class SubstackPost(SubstackSpace):
     format = "post"
+    __slots__ = ("subdomain", "slug", "url", "api_url")
 
     def __init__(self, subdomain: str, slug: str):
         self.subdomain = subdomain
@@ -31,7 +32,7 @@ class SubstackPost(SubstackSpace):
         response = requests.get(self.api_url)
         post_data = response.json()
         post_html: str = post_data["body_html"]
-        post_text: str = html2text(post_html, bodywidth=0)
+        post_text: str = utils.html_to_text(post_html, bodywidth=0)
         post_data["text"] = post_text
 
         return DataObject(
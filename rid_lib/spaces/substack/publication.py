@@ -4,6 +4,7 @@ from .base import SubstackSpace
 
 class SubstackPublication(SubstackSpace):
     format = "publication"
+    __slots__ = ("subdomain",)
 
     def __init__(self, subdomain: str):
         self.subdomain = subdomain
@@ -1,4 +1,5 @@
 from rid_lib.core import RID
 
 class WebSpace(RID):
-    space = "web"
\ No newline at end of file
+    space = "web"
+    __slots__ = ()
\ No newline at end of file
@@ -1,14 +1,15 @@
 import requests
-from html2text import html2text
 from urllib.parse import urlparse
 import json
 
+from rid_lib import utils
 from rid_lib.core import RID, DataObject
 from .base import WebSpace
 
 
 class WebPage(WebSpace):
     format = "page"
+    __slots__ = ("url",)
 
     def __init__(self, url: str):
         self.url = url
@@ -37,8 +38,8 @@ class WebPage(WebSpace):
         files[last_path_elem + ".txt"] = resp.text
         
         if "text/html" in content_type:
-            data["html"] = resp.text
-            data["text"] = html2text(resp.text, bodywidth=0)
+            # raw HTML is only stored as a file, not duplicated in JSON data
+            data["text"] = utils.html_to_text(resp.text, bodywidth=0)
             files[last_path_elem + ".txt"] = data["text"]
             files[last_path_elem + ".html"] = resp.text            
         elif "application/json" in content_type:
@@ -0,0 +1,11 @@
+from html2text import html2text
+
+
+def html_to_text(html: str, **options) -> str:
+    """Converts HTML to markdown text, used when dereferencing web content.
+
+    Options are passed to html2text. Applications can replace this
+    function (e.g. to run conversions in a process pool), dereference
+    functions look it up on this module every time they are called.
+    """
+    return html2text(html, **options)
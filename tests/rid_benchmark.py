@@ -0,0 +1,74 @@
+import timeit
+import tracemalloc
+
+from rid_lib.types import SlackMessage
+
+N = 50_000
+
+# components are built up front, so only RID objects are measured
+components = [
+    ("TMQ3PKXT9", "C06DMGNV7E0", f"{1718870811 + i}.756359")
+    for i in range(N)
+]
+
+
+class UnslottedSlackMessage:
+    """Replica of the previous RID implementation, used as a baseline.
+
+    Attributes live in a per-instance dict, and the canonical string is
+    rebuilt on every call to __str__, __eq__, and __hash__.
+    """
+
+    space = "slack"
+    format = "message"
+
+    def __init__(self, workspace_id, channel_id, message_id):
+        self.workspace_id = workspace_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.thread_id = None
+        self.is_in_thread = False
+        self.reference = f"{workspace_id}/{channel_id}/{message_id}"
+
+    @property
+    def means(self):
+        return self.space + "." + self.format
+
+    def __str__(self):
+        return self.means + ":" + self.reference
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return str(self) == str(other)
+        else:
+            return False
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+def measure_memory(Type):
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    rids = [Type(*args) for args in components]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rids, (end - start) / N
+
+def measure_membership(rids):
+    members = set(rids)
+    # fresh objects, as returned when parsing a request body
+    lookups = [type(rid)(*args) for rid, args in zip(rids, components)]
+    seconds = min(timeit.repeat(
+        lambda: sum(rid in members for rid in lookups), number=1, repeat=5))
+    return seconds / N * 1e9
+
+for name, Type in [
+    ("unslotted (baseline)", UnslottedSlackMessage),
+    ("slotted", SlackMessage)
+]:
+    rids, bytes_per_rid = measure_memory(Type)
+    ns_per_lookup = measure_membership(rids)
+    print(f"{name}:")
+    print(f"\tmemory per RID: {bytes_per_rid:.0f} bytes")
+    print(f"\tset membership: {ns_per_lookup:.0f} ns per lookup")
@@ -0,0 +1,69 @@
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from koi.vectorstore.backends import LocalBackend
+
+N = 20_000
+DIMENSION = 1024
+QUERIES = 64
+TOP_K = 15
+FILTER = {"character_length": {"$gt": 200}}
+
+# clustered like real embeddings, uniformly random vectors have no
+# near neighbors and are a worst case for approximate search
+rng = np.random.default_rng(0)
+centers = rng.normal(size=(256, DIMENSION))
+vectors = (
+    centers[rng.integers(256, size=N)] +
+    rng.normal(scale=0.5, size=(N, DIMENSION))
+).astype(np.float32)
+queries = (
+    centers[rng.integers(256, size=QUERIES)] +
+    rng.normal(scale=0.5, size=(QUERIES, DIMENSION))
+).astype(np.float32)
+
+directory = tempfile.mkdtemp()
+backend = None
+try:
+    backend = LocalBackend(directory, DIMENSION, search="approximate")
+    for start in range(0, N, 10_000):
+        backend.upsert([
+            (f"v{i}", vectors[i], {"character_length": int(i % 512)})
+            for i in range(start, min(start + 10_000, N))
+        ])
+
+    mask = backend.filter_mask(FILTER)
+
+    # exact search is the ground truth for measuring recall of the index
+    start = time.perf_counter()
+    exact = [
+        backend.query_exact(query[None], TOP_K, mask)[0] for query in queries]
+    exact_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+    start = time.perf_counter()
+    backend.query_exact(queries, TOP_K, mask)
+    batched_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+    start = time.perf_counter()
+    approximate = [
+        backend.query_index(query, TOP_K, mask) for query in queries]
+    approximate_ms = (time.perf_counter() - start) / QUERIES * 1000
+
+    recall = np.mean([
+        len({row for row, _ in a} & {row for row, _ in e}) / TOP_K
+        for a, e in zip(approximate, exact)
+    ])
+
+    print(f"{N} vectors, top {TOP_K}, filter {FILTER}:")
+    print(f"\texact: {exact_ms:.2f} ms per query")
+    print(f"\texact (batch of {QUERIES}): {batched_ms:.2f} ms per query")
+    print(f"\tapproximate: {approximate_ms:.2f} ms per query, "
+        f"recall {recall:.3f}")
+finally:
+    # saves the index now, rather than at exit after it is removed
+    if backend is not None:
+        backend.close()
+    shutil.rmtree(directory)
@@ -43,6 +43,9 @@ class RID:
     @staticmethod
     def from_string(rid_str: str) -> RIDTypes: ...
 
+    @staticmethod
+    def from_strings(rid_strs: list[str]) -> list[RIDTypes]: ...
+
     @property
     def means(self) -> str: ...
 
@@ -58,5 +61,7 @@ class RID:
 class DataObject:
     json_data: dict | None = None
     files: dict[str, bytes | str] | None = None
+    sha256_hash: str | None
+    files_sha256_hash: str | None
 
     def to_dict(self) -> dict: ...
\ No newline at end of file